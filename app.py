@@ -1,8 +1,5 @@
 import streamlit as st
-import os
-import sys
 import logging
-import argparse
 
 logging.basicConfig(level=logging.WARNING,
                     format='%(name)s - %(levelname)s - %(message)s')
@@ -12,6 +9,11 @@ logger.setLevel(logging.INFO)
 
 from utils.dbfunctions import verify_login
 import utils.auth as auth
+import utils.water as water
+from utils.dashboard import show_dashboard
+import utils.warmup as warmup
+from utils.instrumentation import show_instrumentation
+from utils.cache import sync_table_versions
 from utils.formatting import apply_custom_css
 
 # Page configuration
@@ -25,6 +27,11 @@ if 'session' not in st.session_state:
 if 'full_name' not in st.session_state:
     st.session_state.full_name = None
 
+# load the shared caches in the background, with the background key while
+# the first user logs in, or else as the first user once they have
+session = st.session_state.session
+warmup.start_warmup(session.access_token if session is not None else None)
+
 apply_custom_css()
 
 # Main login page
@@ -119,6 +126,14 @@ else:
     else:
         st.success(f"Welcome, {st.session_state.full_name}!")
 
+        sync_table_versions()
+
+        show_instrumentation()
+
+        show_dashboard()
+
+        water.show_water_alerts()
+
         dailycol, weeklycol, othercol = st.columns(3, gap='large')
 
         with dailycol:
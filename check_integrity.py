@@ -0,0 +1,49 @@
+import argparse
+import sys
+
+from manage_users import get_supabase_client
+import utils.integrity as integrity
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Check the fish database for inconsistent records',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='Rules:\n' + '\n'.join(f'  {name:<30} {desc}'
+                                      for name, (_, desc) in integrity.integrity_rules.items())
+    )
+    parser.add_argument('-r', '--rule', action='append', choices=list(integrity.integrity_rules),
+                        help='Only run this rule (can be given more than once)')
+    parser.add_argument('-o', '--output', help='Also save the violations to this CSV file')
+
+    args = parser.parse_args()
+
+    try:
+        supabase = get_supabase_client()
+        tables = integrity.load_tables(supabase)
+    except Exception as e:
+        print(f"✗ Error: Could not read the database: {e}")
+        sys.exit(2)
+
+    violations = integrity.scan(tables, rules=args.rule)
+
+    if violations.empty:
+        print("✓ No problems found")
+        return
+
+    for rule, rows in violations.groupby('rule', sort=False):
+        print(f"\n{integrity.integrity_rules[rule][1]} ({len(rows)})")
+        print("-" * 50)
+        for row in rows.itertuples():
+            print(f"{row.table} {row.key}: {row.problem}")
+            print(f"    → {row.fix}")
+
+    print(f"\nTotal problems: {len(violations)}")
+
+    if args.output:
+        violations.to_csv(args.output, index=False)
+        print(f"✓ Saved to {args.output}")
+
+    sys.exit(1)
+
+if __name__ == '__main__':
+    main()
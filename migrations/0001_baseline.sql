@@ -0,0 +1,161 @@
+-- Baseline schema, with the table and column names that utils/dbfunctions.py
+-- uses. Everything is "if not exists", so this is safe to run against the
+-- existing Supabase database: it creates any tables that are missing, but
+-- leaves existing tables as they are (it does not add missing columns to them).
+
+create table if not exists "Systems" (
+    name text primary key,
+    volume double precision,
+    active boolean default true,
+    notes text
+);
+
+create table if not exists "Tanks" (
+    name text primary key,
+    system text references "Systems"(name) on update cascade on delete set null,
+    volume double precision,
+    shelf integer,
+    position_in_shelf integer,
+    is_hospital boolean not null default false,
+    active boolean not null default true,
+    notes text
+);
+
+create table if not exists "Species" (
+    name text primary key,
+    common_name text,
+    num_allowed integer,
+    date_approved date,
+    date_expires date,
+    protocol text
+);
+
+create table if not exists "Locations" (
+    id bigint generated by default as identity primary key,
+    name text not null,
+    notes text
+);
+
+create table if not exists "People" (
+    id bigint generated by default as identity primary key,
+    login_id uuid unique,
+    full_name text not null,
+    username text,
+    password text,
+    access integer not null default 3,
+    level text,
+    active boolean default true,
+    email text,
+    non_tufts_email text,
+    mobile_phone text,
+    notes text
+);
+
+create table if not exists "Collections" (
+    id bigint generated by default as identity primary key,
+    date timestamp not null,
+    "by" text,
+    name text,
+    street_address text,
+    town text,
+    water_body text,
+    phone_number text,
+    url text,
+    latitude double precision,
+    longitude double precision,
+    sampling_gear text,
+    seine_length double precision,
+    number_of_tries integer,
+    water_temp double precision,
+    water_conductivity double precision,
+    water_ph double precision,
+    water_flow_speed double precision,
+    is_commercial boolean,
+    notes text
+);
+
+create table if not exists "Fish" (
+    id text primary key,
+    tank text references "Tanks"(name) on update cascade on delete set null,
+    species text references "Species"(name) on update cascade,
+    status text,
+    number_in_group integer,
+    collection bigint references "Collections"(id) on delete set null,
+    notes text
+);
+
+create table if not exists "Feeding" (
+    id bigint generated by default as identity primary key,
+    date timestamp not null,
+    "by" text,
+    fish text references "Fish"(id) on update cascade on delete cascade,
+    fed boolean,
+    ate boolean,
+    notes text
+);
+
+create table if not exists "Health" (
+    id bigint generated by default as identity primary key,
+    date timestamp not null,
+    "by" text,
+    fish text references "Fish"(id) on update cascade on delete cascade,
+    event_type text,
+    change_status text,
+    from_tank text,
+    to_tank text,
+    treatment text,
+    death_status text,
+    notes text
+);
+
+create table if not exists "WaterQuality" (
+    id bigint generated by default as identity primary key,
+    date timestamp not null,
+    "by" text,
+    system text references "Systems"(name) on update cascade on delete set null,
+    tank text references "Tanks"(name) on update cascade on delete set null,
+    conductivity double precision,
+    ph double precision,
+    ammonia double precision,
+    nitrite double precision,
+    nitrate double precision,
+    water_change_pct double precision,
+    notes text
+);
+
+create table if not exists "Maintenance" (
+    id bigint generated by default as identity primary key,
+    date timestamp not null,
+    "by" text,
+    task text,
+    system text references "Systems"(name) on update cascade on delete set null,
+    notes text
+);
+
+create table if not exists "Groups" (
+    id bigint generated by default as identity primary key,
+    date timestamp not null,
+    "by" text,
+    event_type text,
+    original_group text,
+    new_group text,
+    number_in_group integer,
+    group_1 text,
+    group_2 text,
+    group_3 text,
+    group_4 text,
+    notes text
+);
+
+create table if not exists "Experiments" (
+    id bigint generated by default as identity primary key,
+    date timestamp not null,
+    "by" text,
+    fish text references "Fish"(id) on update cascade on delete cascade,
+    project text,
+    project_description text,
+    experiment_description text,
+    is_terminal boolean default false,
+    n_fish integer default 1,
+    notes text
+);
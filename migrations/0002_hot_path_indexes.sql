@@ -0,0 +1,38 @@
+-- Indexes for the filters that utils/dbfunctions.py and the pages use on
+-- every rerun. Run "python setup_database.py explain" to check which of those
+-- queries would still do a sequential scan.
+
+-- health notes, treatments and tank moves for one fish, newest first
+create index if not exists health_fish_date_idx on "Health" (fish, date desc);
+create index if not exists health_event_type_date_idx on "Health" (event_type, date);
+
+-- feeding summary and Check Fish
+create index if not exists feeding_fish_date_idx on "Feeding" (fish, date desc);
+create index if not exists feeding_date_idx on "Feeding" (date);
+
+-- water checks and alerts per system
+create index if not exists waterquality_system_date_idx on "WaterQuality" (system, date desc);
+create index if not exists waterquality_tank_date_idx on "WaterQuality" (tank, date desc)
+    where tank is not null;
+
+-- maintenance logs for the last N days, and the latest row per task
+create index if not exists maintenance_date_idx on "Maintenance" (date desc);
+create index if not exists maintenance_task_system_date_idx on "Maintenance" (task, system, date desc);
+
+-- live fish, and fish in a tank
+create index if not exists fish_status_idx on "Fish" (status);
+create index if not exists fish_tank_idx on "Fish" (tank);
+
+-- login and the person pickers
+create unique index if not exists people_login_id_idx on "People" (login_id);
+create index if not exists people_full_name_idx on "People" (full_name);
+
+-- lineage and census
+create index if not exists groups_event_type_date_idx on "Groups" (event_type, date);
+create index if not exists groups_original_group_idx on "Groups" (original_group);
+create index if not exists experiments_fish_date_idx on "Experiments" (fish, date);
+
+-- the timeline reads each event table by date
+create index if not exists health_date_idx on "Health" (date);
+create index if not exists groups_date_idx on "Groups" (date);
+create index if not exists experiments_date_idx on "Experiments" (date);
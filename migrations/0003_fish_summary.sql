@@ -0,0 +1,31 @@
+-- One row per fish with its current state, kept up to date by the write
+-- functions in utils/dbfunctions.py so that list pages can read one narrow
+-- table instead of going through the Feeding and Health history.
+--
+-- After running the migrations, use "Rebuild fish summary" on the Tables page
+-- (or db.rebuild_fish_summary()) to fill it in.
+
+create table if not exists fish_summary (
+    fish text primary key references "Fish"(id) on update cascade on delete cascade,
+    species text,
+    tank text references "Tanks"(name) on update cascade on delete set null,
+    status text,
+    number_in_group integer,
+    last_check timestamp,
+    last_fed boolean,
+    last_ate boolean,
+    last_health_date timestamp,
+    last_health_event text,
+    active_treatment text,
+    treatment_start timestamp,
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists fish_summary_status_idx on fish_summary (status);
+create index if not exists fish_summary_tank_idx on fish_summary (tank);
+
+alter table fish_summary enable row level security;
+
+drop policy if exists "Authenticated users can use fish_summary" on fish_summary;
+create policy "Authenticated users can use fish_summary" on fish_summary
+    for all to authenticated using (true) with check (true);
@@ -0,0 +1,117 @@
+-- Full text search over the free text notes in the event tables.
+--
+-- Each table gets a GIN index on the same to_tsvector expression that
+-- search_notes() uses, so a search is an index lookup per table instead of a
+-- scan of every note. Expression indexes are used (instead of generated
+-- columns) so that "select *" on these tables doesn't change.
+--
+-- Called from db.search_notes().
+
+create index if not exists health_notes_fts_idx on "Health"
+    using gin (to_tsvector('english', coalesce(notes, '')));
+create index if not exists feeding_notes_fts_idx on "Feeding"
+    using gin (to_tsvector('english', coalesce(notes, '')));
+create index if not exists maintenance_notes_fts_idx on "Maintenance"
+    using gin (to_tsvector('english', coalesce(notes, '')));
+create index if not exists waterquality_notes_fts_idx on "WaterQuality"
+    using gin (to_tsvector('english', coalesce(notes, '')));
+create index if not exists collections_notes_fts_idx on "Collections"
+    using gin (to_tsvector('english', coalesce(notes, '')));
+create index if not exists experiments_notes_fts_idx on "Experiments"
+    using gin (to_tsvector('english', concat_ws(' ', project, project_description, experiment_description)));
+
+-- search takes web search syntax: fin rot, "fin rot", ich or velvet, -feeding
+create or replace function search_notes(
+    search text,
+    fish_id text default null,
+    system_name text default null,
+    date_from timestamp default null,
+    date_to timestamp default null,
+    max_results integer default 50
+)
+returns table (
+    source text,
+    id bigint,
+    date timestamp,
+    fish text,
+    system text,
+    rank real,
+    snippet text
+)
+language sql stable
+as $$
+    with q as (
+        select websearch_to_tsquery('english', search) as query
+    ),
+    hits as (
+        select 'Health' as source, h.id::bigint as id, h.date::timestamp as date,
+               h.fish, t.system, h.notes as body,
+               ts_rank(to_tsvector('english', coalesce(h.notes, '')), q.query) as rank
+        from "Health" h
+        cross join q
+        left join "Fish" f on f.id = h.fish
+        left join "Tanks" t on t.name = f.tank
+        where to_tsvector('english', coalesce(h.notes, '')) @@ q.query
+
+        union all
+        select 'Feeding', fd.id::bigint, fd.date::timestamp, fd.fish, t.system, fd.notes,
+               ts_rank(to_tsvector('english', coalesce(fd.notes, '')), q.query)
+        from "Feeding" fd
+        cross join q
+        left join "Fish" f on f.id = fd.fish
+        left join "Tanks" t on t.name = f.tank
+        where to_tsvector('english', coalesce(fd.notes, '')) @@ q.query
+
+        union all
+        select 'Maintenance', m.id::bigint, m.date::timestamp, null, m.system, m.notes,
+               ts_rank(to_tsvector('english', coalesce(m.notes, '')), q.query)
+        from "Maintenance" m
+        cross join q
+        where to_tsvector('english', coalesce(m.notes, '')) @@ q.query
+
+        union all
+        select 'WaterQuality', w.id::bigint, w.date::timestamp, null, coalesce(w.system, w.tank), w.notes,
+               ts_rank(to_tsvector('english', coalesce(w.notes, '')), q.query)
+        from "WaterQuality" w
+        cross join q
+        where to_tsvector('english', coalesce(w.notes, '')) @@ q.query
+
+        union all
+        select 'Collections', c.id::bigint, c.date::timestamp, null, null, c.notes,
+               ts_rank(to_tsvector('english', coalesce(c.notes, '')), q.query)
+        from "Collections" c
+        cross join q
+        where to_tsvector('english', coalesce(c.notes, '')) @@ q.query
+
+        union all
+        select 'Experiments', e.id::bigint, e.date::timestamp, e.fish, t.system,
+               concat_ws(' ', e.project, e.project_description, e.experiment_description),
+               ts_rank(to_tsvector('english', concat_ws(' ', e.project, e.project_description,
+                                                        e.experiment_description)), q.query)
+        from "Experiments" e
+        cross join q
+        left join "Fish" f on f.id = e.fish
+        left join "Tanks" t on t.name = f.tank
+        where to_tsvector('english', concat_ws(' ', e.project, e.project_description,
+                                               e.experiment_description)) @@ q.query
+    ),
+    best as (
+        select *
+        from hits
+        where (fish_id is null or hits.fish = fish_id)
+          and (system_name is null or hits.system = system_name)
+          and (date_from is null or hits.date >= date_from)
+          and (date_to is null or hits.date < date_to)
+        order by rank desc, date desc
+        limit max_results
+    )
+    -- only build snippets for the rows that are returned
+    select best.source, best.id, best.date, best.fish, best.system, best.rank,
+           ts_headline('english', best.body, q.query,
+                       'StartSel=**, StopSel=**, MaxFragments=2, MinWords=5, MaxWords=20')
+    from best
+    cross join q
+    order by best.rank desc, best.date desc;
+$$;
+
+grant execute on function search_notes(text, text, text, timestamp, timestamp, integer) to authenticated;
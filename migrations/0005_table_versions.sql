@@ -0,0 +1,48 @@
+-- One row per table with a counter that goes up on every write, so the app
+-- can tell whether its cached copy of a table is stale with one tiny request
+-- (utils/cache.py sync_table_versions) instead of reading the table again.
+--
+-- The counters are bumped by statement level triggers, so writes made outside
+-- the app (the Supabase dashboard, scripts) are seen too.
+
+create table if not exists table_versions (
+    table_name text primary key,
+    version bigint not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create or replace function bump_table_version()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into table_versions (table_name, version, updated_at)
+    values (TG_TABLE_NAME, 1, now())
+    on conflict (table_name)
+    do update set version = table_versions.version + 1, updated_at = now();
+    return null;
+end;
+$$;
+
+-- the tables that are kept in the shared cache
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['Fish', 'Tanks', 'Systems', 'People', 'Species'] loop
+        execute format('drop trigger if exists bump_table_version on %I', t);
+        execute format('create trigger bump_table_version
+                            after insert or update or delete or truncate on %I
+                            for each statement execute function bump_table_version()', t);
+        insert into table_versions (table_name) values (t) on conflict do nothing;
+    end loop;
+end;
+$$;
+
+alter table table_versions enable row level security;
+
+drop policy if exists "Authenticated users can read table_versions" on table_versions;
+create policy "Authenticated users can read table_versions" on table_versions
+    for select to authenticated using (true);
@@ -0,0 +1,87 @@
+-- Everything the home page dashboard shows, in one request: fish counts by
+-- status, sick and quarantined fish, systems whose water is overdue, live
+-- fish that haven't been checked today, open treatments and permits that are
+-- about to expire.
+--
+-- Reads the narrow fish_summary table (0003) instead of the Feeding and
+-- Health history, and the latest water check per system through
+-- waterquality_system_date_idx (0002).
+--
+-- The app passes today's date, since the database clock is in UTC and the
+-- event dates are in lab time. Called from db.get_dashboard_summary().
+
+create or replace function dashboard_summary(
+    today date,
+    water_check_days integer default 1,
+    permit_warning_days integer default 30
+)
+returns jsonb
+language sql stable
+as $$
+    select jsonb_build_object(
+        'status_counts', (
+            select coalesce(jsonb_agg(c order by c.status), '[]'::jsonb)
+            from (
+                select coalesce(status, 'Unknown') as status,
+                       count(*) as fish,
+                       sum(coalesce(number_in_group, 1)) as animals
+                from fish_summary
+                group by 1
+            ) c
+        ),
+        'needs_attention', (
+            select coalesce(jsonb_agg(a order by a.status, a.fish), '[]'::jsonb)
+            from (
+                select fish, tank, status, last_health_date, last_health_event
+                from fish_summary
+                where status in ('Sick', 'Quarantine')
+            ) a
+        ),
+        'water_overdue', (
+            select coalesce(jsonb_agg(w order by w.last_check nulls first), '[]'::jsonb)
+            from (
+                select s.name as system, latest.date as last_check
+                from "Systems" s
+                left join lateral (
+                    select date
+                    from "WaterQuality"
+                    where system = s.name
+                    order by date desc
+                    limit 1
+                ) latest on true
+                where coalesce(s.active, true)
+                  and (latest.date is null
+                       or latest.date::date <= today - water_check_days)
+            ) w
+        ),
+        'unchecked_today', (
+            select coalesce(jsonb_agg(u order by u.fish), '[]'::jsonb)
+            from (
+                select fish, tank, last_check
+                from fish_summary
+                where status is distinct from 'Dead'
+                  and (last_check is null or last_check::date < today)
+            ) u
+        ),
+        'open_treatments', (
+            select coalesce(jsonb_agg(t order by t.treatment_start), '[]'::jsonb)
+            from (
+                select fish, tank, active_treatment as treatment, treatment_start
+                from fish_summary
+                where active_treatment is not null
+                  and status is distinct from 'Dead'
+            ) t
+        ),
+        'permits_expiring', (
+            select coalesce(jsonb_agg(p order by p.date_expires), '[]'::jsonb)
+            from (
+                select name as species, date_expires
+                from "Species"
+                where date_expires is not null
+                  and date_expires <= today + permit_warning_days
+            ) p
+        )
+    );
+$$;
+
+grant execute on function dashboard_summary(date, integer, integer) to authenticated;
@@ -0,0 +1,17 @@
+-- The most recent Maintenance row for each task and system, so the Weekly and
+-- Monthly Tasks pages can show when each task was last done, and which are
+-- overdue, from one small request instead of reading the whole log.
+--
+-- distinct on walks maintenance_task_system_date_idx (0002) in order and
+-- takes the first row of each (task, system). Read by
+-- db.get_latest_maintenance().
+
+create or replace view maintenance_latest
+with (security_invoker = true)
+as
+select distinct on (task, system)
+    task, system, date, "by", notes
+from "Maintenance"
+order by task, system, date desc;
+
+grant select on maintenance_latest to authenticated;
@@ -0,0 +1,72 @@
+-- Tank moves and status changes for many fish at once (quarantine a system,
+-- move a shelf, change the status of a selection), as one atomic call.
+--
+-- changes is a JSON array of {"fish": ..., "to_tank": ..., "new_status": ...};
+-- to_tank and new_status can be null to leave them as they are. Every Health
+-- event, Fish update and fish_summary row is written in the same transaction,
+-- so either every fish is changed or none are.
+--
+-- Called from db.apply_fish_changes(); utils/bulk.py builds and previews the
+-- changes.
+
+create or replace function apply_fish_changes(
+    changes jsonb,
+    event_date timestamp,
+    person text,
+    notes text default null
+)
+returns integer
+language plpgsql
+as $$
+declare
+    missing text;
+    n_changed integer;
+begin
+    create temporary table bulk_changes on commit drop as
+    select c.fish, c.to_tank, c.new_status, f.tank as from_tank
+    from jsonb_to_recordset(changes) as c(fish text, to_tank text, new_status text)
+    left join "Fish" f on f.id = c.fish;
+
+    select string_agg(b.fish, ', ') into missing
+    from bulk_changes b
+    where not exists (select 1 from "Fish" f where f.id = b.fish);
+    if missing is not null then
+        raise exception 'Fish not in the database: %', missing;
+    end if;
+
+    -- lock the fish, so nothing else changes them half way through
+    perform 1 from "Fish" f join bulk_changes b on b.fish = f.id for update of f;
+
+    insert into "Health" (date, "by", fish, event_type, from_tank, to_tank, change_status, notes)
+    select event_date, person, b.fish,
+           case when b.to_tank is not null then 'Tank Move' else 'Change Status' end,
+           case when b.to_tank is not null then b.from_tank end,
+           b.to_tank, b.new_status, notes
+    from bulk_changes b;
+
+    update "Fish" f
+    set tank = coalesce(b.to_tank, f.tank),
+        status = coalesce(b.new_status, f.status)
+    from bulk_changes b
+    where f.id = b.fish;
+    get diagnostics n_changed = row_count;
+
+    insert into fish_summary (fish, species, tank, status, number_in_group,
+                              last_health_date, last_health_event, updated_at)
+    select f.id, f.species, f.tank, f.status, f.number_in_group, event_date,
+           case when b.to_tank is not null then 'Tank Move' else 'Change Status' end,
+           now()
+    from "Fish" f
+    join bulk_changes b on b.fish = f.id
+    on conflict (fish) do update
+    set tank = excluded.tank,
+        status = excluded.status,
+        last_health_date = excluded.last_health_date,
+        last_health_event = excluded.last_health_event,
+        updated_at = excluded.updated_at;
+
+    return n_changed;
+end;
+$$;
+
+grant execute on function apply_fish_changes(jsonb, timestamp, text, text) to authenticated;
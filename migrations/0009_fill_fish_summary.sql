@@ -0,0 +1,45 @@
+-- Fill in fish_summary (0003) for every fish that doesn't have a row yet,
+-- from the latest Feeding and Health rows of each fish. This used to be done
+-- by the app the first time it found the table empty; after this migration
+-- the write functions in utils/dbfunctions.py keep it up to date, and
+-- db.rebuild_fish_summary() ("Rebuild fish summary" on the Tables page) can
+-- still be used to rebuild it from scratch.
+--
+-- Uses feeding_fish_date_idx and health_fish_date_idx (0002) to find the
+-- latest rows, one fish at a time.
+
+insert into fish_summary (fish, species, tank, status, number_in_group,
+                          last_check, last_fed, last_ate,
+                          last_health_date, last_health_event,
+                          active_treatment, treatment_start)
+select f.id, f.species, f.tank, f.status, f.number_in_group,
+       fd.date, fd.fed, fd.ate,
+       h.date, h.event_type,
+       case when t.event_type in ('Start Treatment', 'Treatment Start')
+            then coalesce(t.treatment, 'Treatment') end,
+       case when t.event_type in ('Start Treatment', 'Treatment Start')
+            then t.date end
+from "Fish" f
+left join lateral (
+    select date, fed, ate
+    from "Feeding"
+    where fish = f.id
+    order by date desc
+    limit 1
+) fd on true
+left join lateral (
+    select date, event_type
+    from "Health"
+    where fish = f.id
+    order by date desc
+    limit 1
+) h on true
+left join lateral (
+    select date, event_type, treatment
+    from "Health"
+    where fish = f.id
+      and event_type in ('Start Treatment', 'Treatment Start', 'End Treatment', 'Treatment End')
+    order by date desc
+    limit 1
+) t on true
+on conflict (fish) do nothing;
@@ -0,0 +1,30 @@
+-- Version counter for fish_summary, now that db.get_fish_summary is kept in
+-- the shared cache (see 0005_table_versions.sql). The summary also has each
+-- tank's system and shelf, so a change to Tanks bumps it too.
+
+drop trigger if exists bump_table_version on fish_summary;
+create trigger bump_table_version
+    after insert or update or delete or truncate on fish_summary
+    for each statement execute function bump_table_version();
+
+create or replace function bump_fish_summary_version()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into table_versions (table_name, version, updated_at)
+    values ('fish_summary', 1, now())
+    on conflict (table_name)
+    do update set version = table_versions.version + 1, updated_at = now();
+    return null;
+end;
+$$;
+
+drop trigger if exists bump_fish_summary_version on "Tanks";
+create trigger bump_fish_summary_version
+    after update or delete or truncate on "Tanks"
+    for each statement execute function bump_fish_summary_version();
+
+insert into table_versions (table_name) values ('fish_summary') on conflict do nothing;
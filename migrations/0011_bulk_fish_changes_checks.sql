@@ -0,0 +1,118 @@
+-- Checks in apply_fish_changes (0008_bulk_fish_changes.sql) that the changes
+-- are still safe to apply when they are written, not just when they were
+-- previewed in utils/bulk.py:
+--
+--  * a fish listed twice would get two Health events and whichever tank came
+--    last, so the whole call is rejected
+--  * each change carries the tank and status the preview showed
+--    (expected_tank, expected_status); if the fish has changed since, the
+--    call is rejected and the preview has to be made again
+--  * a new tank that now has live fish that are not moving is rejected
+--
+-- It now returns what it changed, as a JSON array of
+-- {"fish", "old_tank", "old_status", "tank", "status"}, read after the fish
+-- were locked. The return type changed, so the old function is dropped first.
+
+drop function if exists apply_fish_changes(jsonb, timestamp, text, text);
+
+create function apply_fish_changes(
+    changes jsonb,
+    event_date timestamp,
+    person text,
+    notes text default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    repeated text;
+    missing text;
+    stale text;
+    occupied text;
+    changed jsonb;
+begin
+    -- lock the fish first, so nothing else changes them half way through and
+    -- the checks below see what will be changed
+    perform 1 from "Fish" f
+    where f.id in (select c.fish from jsonb_to_recordset(changes) as c(fish text))
+    for update of f;
+
+    create temporary table bulk_changes on commit drop as
+    select c.fish, c.to_tank, c.new_status, c.expected_tank, c.expected_status,
+           f.tank as from_tank, f.status as from_status
+    from jsonb_to_recordset(changes)
+        as c(fish text, to_tank text, new_status text, expected_tank text, expected_status text)
+    left join "Fish" f on f.id = c.fish;
+
+    select string_agg(d.fish, ', ') into repeated
+    from (select fish from bulk_changes group by fish having count(*) > 1) d;
+    if repeated is not null then
+        raise exception 'Fish listed more than once: %', repeated;
+    end if;
+
+    select string_agg(b.fish, ', ') into missing
+    from bulk_changes b
+    where not exists (select 1 from "Fish" f where f.id = b.fish);
+    if missing is not null then
+        raise exception 'Fish not in the database: %', missing;
+    end if;
+
+    select string_agg(b.fish, ', ') into stale
+    from bulk_changes b
+    where b.from_tank is distinct from b.expected_tank
+       or b.from_status is distinct from b.expected_status;
+    if stale is not null then
+        raise exception 'Fish changed since the preview: %', stale;
+    end if;
+
+    select string_agg(distinct f.tank, ', ') into occupied
+    from "Fish" f
+    join bulk_changes b on b.to_tank = f.tank
+    where f.status is distinct from 'Dead'
+      and not exists (select 1 from bulk_changes m
+                      where m.fish = f.id and m.to_tank is not null);
+    if occupied is not null then
+        raise exception 'Tanks already have fish: %', occupied;
+    end if;
+
+    insert into "Health" (date, "by", fish, event_type, from_tank, to_tank, change_status, notes)
+    select event_date, person, b.fish,
+           case when b.to_tank is not null then 'Tank Move' else 'Change Status' end,
+           case when b.to_tank is not null then b.from_tank end,
+           b.to_tank, b.new_status, notes
+    from bulk_changes b;
+
+    update "Fish" f
+    set tank = coalesce(b.to_tank, f.tank),
+        status = coalesce(b.new_status, f.status)
+    from bulk_changes b
+    where f.id = b.fish;
+
+    insert into fish_summary (fish, species, tank, status, number_in_group,
+                              last_health_date, last_health_event, updated_at)
+    select f.id, f.species, f.tank, f.status, f.number_in_group, event_date,
+           case when b.to_tank is not null then 'Tank Move' else 'Change Status' end,
+           now()
+    from "Fish" f
+    join bulk_changes b on b.fish = f.id
+    on conflict (fish) do update
+    set tank = excluded.tank,
+        status = excluded.status,
+        last_health_date = excluded.last_health_date,
+        last_health_event = excluded.last_health_event,
+        updated_at = excluded.updated_at;
+
+    select coalesce(jsonb_agg(jsonb_build_object(
+               'fish', b.fish,
+               'old_tank', b.from_tank,
+               'old_status', b.from_status,
+               'tank', coalesce(b.to_tank, b.from_tank),
+               'status', coalesce(b.new_status, b.from_status))), '[]'::jsonb)
+    into changed
+    from bulk_changes b;
+
+    return changed;
+end;
+$$;
+
+grant execute on function apply_fish_changes(jsonb, timestamp, text, text) to authenticated;
@@ -0,0 +1,105 @@
+-- Number of live and used (terminal experiments) animals of each species, for
+-- the permit checks in db.check_permits. Kept up to date by row triggers on
+-- Fish and Experiments, so adding a fish changes one row here instead of
+-- counting every live fish and terminal experiment again.
+--
+-- A fish with no number_in_group counts as one animal, and so does a
+-- terminal experiment with no n_fish.
+
+create table if not exists species_headcount (
+    species text primary key,
+    alive integer not null default 0,
+    used integer not null default 0
+);
+
+create or replace function adjust_species_headcount(sp text, d_alive integer, d_used integer)
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+    insert into species_headcount (species, alive, used)
+    select sp, d_alive, d_used
+    where sp is not null and (d_alive <> 0 or d_used <> 0)
+    on conflict (species) do update
+    set alive = species_headcount.alive + excluded.alive,
+        used = species_headcount.used + excluded.used;
+$$;
+
+create or replace function fish_headcount_changed()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if TG_OP in ('UPDATE', 'DELETE') and old.status is distinct from 'Dead' then
+        perform adjust_species_headcount(old.species, -coalesce(old.number_in_group, 1), 0);
+    end if;
+    if TG_OP in ('INSERT', 'UPDATE') and new.status is distinct from 'Dead' then
+        perform adjust_species_headcount(new.species, coalesce(new.number_in_group, 1), 0);
+    end if;
+    return null;
+end;
+$$;
+
+create or replace function experiment_headcount_changed()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if TG_OP in ('UPDATE', 'DELETE') and old.is_terminal then
+        perform adjust_species_headcount((select species from "Fish" where id = old.fish),
+                                         0, -coalesce(old.n_fish, 1));
+    end if;
+    if TG_OP in ('INSERT', 'UPDATE') and new.is_terminal then
+        perform adjust_species_headcount((select species from "Fish" where id = new.fish),
+                                         0, coalesce(new.n_fish, 1));
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists species_headcount on "Fish";
+create trigger species_headcount
+    after insert or update of species, status, number_in_group or delete on "Fish"
+    for each row execute function fish_headcount_changed();
+
+drop trigger if exists species_headcount on "Experiments";
+create trigger species_headcount
+    after insert or update of fish, is_terminal, n_fish or delete on "Experiments"
+    for each row execute function experiment_headcount_changed();
+
+-- start from the counts as they are now
+truncate species_headcount;
+
+insert into species_headcount (species, alive, used)
+select species, sum(alive), sum(used)
+from (
+    select f.species, coalesce(f.number_in_group, 1) as alive, 0 as used
+    from "Fish" f
+    where f.status is distinct from 'Dead'
+    union all
+    select f.species, 0, coalesce(e.n_fish, 1)
+    from "Experiments" e
+    join "Fish" f on f.id = e.fish
+    where e.is_terminal
+) counts
+where species is not null
+group by species;
+
+-- cached in the app with the shared cache (see 0005_table_versions.sql)
+drop trigger if exists bump_table_version on species_headcount;
+create trigger bump_table_version
+    after insert or update or delete or truncate on species_headcount
+    for each statement execute function bump_table_version();
+
+insert into table_versions (table_name) values ('species_headcount') on conflict do nothing;
+
+alter table species_headcount enable row level security;
+
+drop policy if exists "Authenticated users can read species_headcount" on species_headcount;
+create policy "Authenticated users can read species_headcount" on species_headcount
+    for select to authenticated using (true);
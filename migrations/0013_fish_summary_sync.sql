@@ -0,0 +1,48 @@
+-- Keep the Fish columns of fish_summary (0003) in step with the Fish table,
+-- whoever writes to it: the app, the Tables page, SQL or an import. A new
+-- fish gets its summary row here, so the app only has to update the history
+-- columns (last check, last health event, treatment) of existing rows.
+--
+-- Rows are deleted with their fish by the foreign key's on delete cascade.
+
+create or replace function sync_fish_summary()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into fish_summary (fish, species, tank, status, number_in_group, updated_at)
+    values (new.id, new.species, new.tank, new.status, new.number_in_group, now())
+    on conflict (fish) do update
+    set species = excluded.species,
+        tank = excluded.tank,
+        status = excluded.status,
+        number_in_group = excluded.number_in_group,
+        updated_at = excluded.updated_at;
+    return null;
+end;
+$$;
+
+drop trigger if exists sync_fish_summary on "Fish";
+create trigger sync_fish_summary
+    after insert or update of id, species, tank, status, number_in_group on "Fish"
+    for each row execute function sync_fish_summary();
+
+-- catch up with anything written before the trigger existed, including the
+-- rows with no status that partial upserts used to make
+insert into fish_summary (fish, species, tank, status, number_in_group)
+select id, species, tank, status, number_in_group
+from "Fish"
+on conflict (fish) do nothing;
+
+update fish_summary s
+set species = f.species,
+    tank = f.tank,
+    status = f.status,
+    number_in_group = f.number_in_group,
+    updated_at = now()
+from "Fish" f
+where f.id = s.fish
+  and (s.species, s.tank, s.status, s.number_in_group)
+      is distinct from (f.species, f.tank, f.status, f.number_in_group);
@@ -0,0 +1,37 @@
+-- When each live fish was last fed and last ate, and how many checks in a row
+-- it has refused food (fed but didn't eat, counting back from its latest
+-- check), grouped in the database so the app gets one row per fish instead
+-- of the raw Feeding history. Fish with no checks at all are left out.
+--
+-- Each lookup goes through feeding_fish_date_idx (0002), one fish at a time,
+-- so there is no cut-off date: a fish that last ate months ago shows that.
+-- Called from db.get_feeding_summary().
+
+create or replace function feeding_summary()
+returns table (fish text, last_fed timestamp, last_ate timestamp, refusals integer)
+language sql stable
+as $$
+    select f.id,
+           (select max(d.date) from "Feeding" d where d.fish = f.id and d.fed),
+           (select max(d.date) from "Feeding" d where d.fish = f.id and d.ate),
+           (select count(*)::integer from "Feeding" d
+            where d.fish = f.id
+              and d.date > coalesce((select max(o.date) from "Feeding" o
+                                     where o.fish = f.id
+                                       and not (coalesce(o.fed, false) and not coalesce(o.ate, false))),
+                                    '-infinity'))
+    from "Fish" f
+    where f.status is distinct from 'Dead'
+      and exists (select 1 from "Feeding" d where d.fish = f.id);
+$$;
+
+grant execute on function feeding_summary() to authenticated;
+
+-- the summary is kept in the app's shared cache, so it needs to know when
+-- Feeding changes (see 0005_table_versions.sql)
+drop trigger if exists bump_table_version on "Feeding";
+create trigger bump_table_version
+    after insert or update or delete or truncate on "Feeding"
+    for each statement execute function bump_table_version();
+
+insert into table_versions (table_name) values ('Feeding') on conflict do nothing;
@@ -0,0 +1,136 @@
+-- More checks in apply_fish_changes (0011_bulk_fish_changes_checks.sql):
+--
+--  * fish from more than one tank going to the same new tank are rejected,
+--    and the new tanks are locked, so two moves that each looked fine in
+--    their previews can't merge tanks
+--  * status Dead is rejected: a death also clears the tank and group size and
+--    records the cause, which log_health_event does one fish at a time
+--
+-- Same arguments and return value as in 0011.
+
+create or replace function apply_fish_changes(
+    changes jsonb,
+    event_date timestamp,
+    person text,
+    notes text default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    repeated text;
+    missing text;
+    stale text;
+    occupied text;
+    dying text;
+    merged text;
+    changed jsonb;
+begin
+    -- lock the fish first, so nothing else changes them half way through and
+    -- the checks below see what will be changed
+    perform 1 from "Fish" f
+    where f.id in (select c.fish from jsonb_to_recordset(changes) as c(fish text))
+    for update of f;
+
+    -- and the new tanks, so that two bulk changes into the same tank run one
+    -- after the other, and the second one sees the fish the first one put there
+    perform 1 from "Tanks" t
+    where t.name in (select c.to_tank from jsonb_to_recordset(changes) as c(to_tank text))
+    for update of t;
+
+    create temporary table bulk_changes on commit drop as
+    select c.fish, c.to_tank, c.new_status, c.expected_tank, c.expected_status,
+           f.tank as from_tank, f.status as from_status
+    from jsonb_to_recordset(changes)
+        as c(fish text, to_tank text, new_status text, expected_tank text, expected_status text)
+    left join "Fish" f on f.id = c.fish;
+
+    select string_agg(d.fish, ', ') into repeated
+    from (select fish from bulk_changes group by fish having count(*) > 1) d;
+    if repeated is not null then
+        raise exception 'Fish listed more than once: %', repeated;
+    end if;
+
+    select string_agg(b.fish, ', ') into dying
+    from bulk_changes b
+    where b.new_status = 'Dead';
+    if dying is not null then
+        raise exception 'Deaths are recorded one fish at a time: %', dying;
+    end if;
+
+    select string_agg(b.fish, ', ') into missing
+    from bulk_changes b
+    where not exists (select 1 from "Fish" f where f.id = b.fish);
+    if missing is not null then
+        raise exception 'Fish not in the database: %', missing;
+    end if;
+
+    select string_agg(b.fish, ', ') into stale
+    from bulk_changes b
+    where b.from_tank is distinct from b.expected_tank
+       or b.from_status is distinct from b.expected_status;
+    if stale is not null then
+        raise exception 'Fish changed since the preview: %', stale;
+    end if;
+
+    select string_agg(m.to_tank, ', ') into merged
+    from (select b.to_tank
+          from bulk_changes b
+          where b.to_tank is not null
+          group by b.to_tank
+          having count(distinct b.from_tank) > 1) m;
+    if merged is not null then
+        raise exception 'Fish from more than one tank would go to: %', merged;
+    end if;
+
+    select string_agg(distinct f.tank, ', ') into occupied
+    from "Fish" f
+    join bulk_changes b on b.to_tank = f.tank
+    where f.status is distinct from 'Dead'
+      and not exists (select 1 from bulk_changes m
+                      where m.fish = f.id and m.to_tank is not null);
+    if occupied is not null then
+        raise exception 'Tanks already have fish: %', occupied;
+    end if;
+
+    insert into "Health" (date, "by", fish, event_type, from_tank, to_tank, change_status, notes)
+    select event_date, person, b.fish,
+           case when b.to_tank is not null then 'Tank Move' else 'Change Status' end,
+           case when b.to_tank is not null then b.from_tank end,
+           b.to_tank, b.new_status, notes
+    from bulk_changes b;
+
+    update "Fish" f
+    set tank = coalesce(b.to_tank, f.tank),
+        status = coalesce(b.new_status, f.status)
+    from bulk_changes b
+    where f.id = b.fish;
+
+    insert into fish_summary (fish, species, tank, status, number_in_group,
+                              last_health_date, last_health_event, updated_at)
+    select f.id, f.species, f.tank, f.status, f.number_in_group, event_date,
+           case when b.to_tank is not null then 'Tank Move' else 'Change Status' end,
+           now()
+    from "Fish" f
+    join bulk_changes b on b.fish = f.id
+    on conflict (fish) do update
+    set tank = excluded.tank,
+        status = excluded.status,
+        last_health_date = excluded.last_health_date,
+        last_health_event = excluded.last_health_event,
+        updated_at = excluded.updated_at;
+
+    select coalesce(jsonb_agg(jsonb_build_object(
+               'fish', b.fish,
+               'old_tank', b.from_tank,
+               'old_status', b.from_status,
+               'tank', coalesce(b.to_tank, b.from_tank),
+               'status', coalesce(b.new_status, b.from_status))), '[]'::jsonb)
+    into changed
+    from bulk_changes b;
+
+    return changed;
+end;
+$$;
+
+grant execute on function apply_fish_changes(jsonb, timestamp, text, text) to authenticated;
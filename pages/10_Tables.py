@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
 import logging
+import time
+from datetime import timedelta
 
 import utils.dbfunctions as db
+from utils.export import build_export, export_formats
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -20,15 +23,21 @@ all_tables = db.get_all_table_names()
 
 table_name = st.selectbox("Select Table to View", options=all_tables, 
                           index=all_tables.index('Fish'))
+fast_transfer = st.toggle("Fast transfer (CSV)", value=True,
+                          help="Download the table as CSV instead of JSON. Much faster for large tables")
 
 # Load and display fish data
 table = None
 with st.spinner(f"Loading table {table_name}..."):
-    table = db.get_all_from_table(table_name, return_df=True)
+    load_start = time.perf_counter()
+    table = db.get_all_from_table(table_name, return_df=True, as_csv=fast_transfer)
+    load_time = time.perf_counter() - load_start
+    logger.debug(f"Loaded {table_name} ({'CSV' if fast_transfer else 'JSON'}) in {load_time:.3f} s")
 
 if table is not None:
     if not table.empty:
         st.success(f"Found {len(table)} records in the {table_name} table")
+        st.caption(f"Loaded in {load_time:.2f} s ({'CSV' if fast_transfer else 'JSON'} transfer)")
                 
         st.markdown("## Filter")
         filtercol, fishcol, bycol, datecol1, datecol2 = st.columns(5)
@@ -37,20 +46,25 @@ if table is not None:
         is_by = pd.Series([True] * len(table))
         is_date = pd.Series([True] * len(table))
 
+        # the same filters, in a form that can be sent to the database for exports
+        filters = []
+
         if 'fish' in table.columns:
             with fishcol:
                 fish_filter = st.multiselect("Fish", options=[""] + sorted(table['fish'].astype(str).unique().tolist()))
                 if fish_filter:
                     is_fish = table['fish'].isin(fish_filter)
+                    filters.append(('in_', 'fish', fish_filter))
 
         if 'by' in table.columns:
             with bycol:
                 by_filter = st.multiselect("By", options=[""] + sorted(table['by'].astype(str).unique().tolist()))
                 if by_filter:
                     is_by = table['by'].isin(by_filter)
+                    filters.append(('in_', 'by', by_filter))
 
         if 'date' in table.columns:
-            dates = pd.to_datetime(table['date']).dt.date
+            dates = pd.to_datetime(table['date'], format='ISO8601').dt.date
             logger.debug(f"{dates=}")
                          
             with datecol1:
@@ -63,36 +77,74 @@ if table is not None:
             if start_date_filter and not end_date_filter:
                 is_date = (dates >= start_date_filter)
             elif end_date_filter and not start_date_filter:
-                isdate = (dates <= end_date_filter)
+                is_date = (dates <= end_date_filter)
             elif start_date_filter and end_date_filter:
-                isdate = (dates <= end_date_filter) & \
+                is_date = (dates <= end_date_filter) & \
                          (dates >= start_date_filter)
 
+            if start_date_filter:
+                filters.append(('gte', 'date', start_date_filter.isoformat()))
+            if end_date_filter:
+                filters.append(('lt', 'date', (end_date_filter + timedelta(days=1)).isoformat()))
+
         with filtercol:
-            do_filter = st.button("Filter")
+            do_filter = st.checkbox("Filter")
 
         if do_filter:
             filtered_table = table[is_fish & is_by & is_date]
         else:
             filtered_table = table
+            filters = []
         
         # Display dataframe
         st.markdown("## Data")        
         st.dataframe(filtered_table, width='stretch')
         
-        # Optional: Add download button
-        csv = table.to_csv(index=False)
-        st.download_button(
-            label="📥 Download as CSV",
-            data=csv,
-            file_name="fish_data.csv",
-            mime="text/csv"
-        )
+        # Export is only built when someone asks for it, one page at a time
+        st.markdown("## Export")
+        scopecol, formatcol, buildcol = st.columns(3)
+        with scopecol:
+            scope = st.radio("What to export",
+                             [f"{table_name} table" + (" (filtered)" if filters else ""),
+                              "Full backup (all tables)"])
+        with formatcol:
+            export_format = st.radio("Format", list(export_formats.keys()))
+        with buildcol:
+            prepare_export = st.button("Prepare export")
+
+        if prepare_export:
+            if scope.startswith("Full backup"):
+                export_tables = {t1: None for t1 in all_tables}
+                file_name = "fishdb_backup.zip"
+            else:
+                export_tables = {table_name: filters}
+                file_name = f"{table_name}.zip"
+
+            try:
+                with st.spinner("Building export..."):
+                    export_file = build_export(export_tables, fmt=export_formats[export_format])
+            except Exception as e:
+                st.error(f"Error building export: {e}")
+            else:
+                st.download_button(
+                    label="📥 Download",
+                    data=export_file,
+                    file_name=file_name,
+                    mime="application/zip"
+                )
     else:
         st.info(f"The {table_name} table is empty.")
 else:
     st.error(f"Could not load {table_name}. Please check if the database and table exist.")
 
+with st.expander("Maintenance", expanded=False):
+    st.write("The fish summary table holds the current state of each fish for the list pages. "
+             "Rebuild it from the full history if it looks out of date.")
+    if st.button("🔄 Rebuild fish summary"):
+        with st.spinner("Rebuilding fish summary..."):
+            n = db.rebuild_fish_summary()
+        st.success(f"Rebuilt the summary for {n} fish")
+
 # Logout button
 if st.button("Logout"):
     st.session_state.logged_in = False
@@ -0,0 +1,68 @@
+import streamlit as st
+from datetime import datetime, timedelta
+import logging
+
+import utils.dbfunctions as db
+import utils.water as water
+from utils.formatting import apply_custom_css
+import utils.auth as auth
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Page configuration
+st.set_page_config(page_title="Water Trends", page_icon="📈", layout="wide")
+
+db.stop_if_not_logged_in()
+
+apply_custom_css()
+
+st.title("📈 Water Trends")
+st.subheader(f"Logged in as: {st.session_state.full_name}")
+
+daily = water.get_rollups('D')
+
+if daily.empty:
+    st.info("No water quality checks have been logged yet.")
+    st.stop()
+
+locations = sorted(daily['location'].dropna().unique().tolist())
+
+paramcol, statcol, startcol, endcol = st.columns(4, gap='small')
+
+with paramcol:
+    param = st.selectbox("Parameter", list(water.water_params.keys()),
+                         format_func=lambda p: water.water_params[p])
+with statcol:
+    stat = st.selectbox("Statistic", water.rollup_stats, index=2)
+with startcol:
+    start_date = st.date_input("Start date", value=datetime.now() - timedelta(days=90))
+with endcol:
+    end_date = st.date_input("End date", value="today")
+
+selected_locations = st.multiselect("Systems and tanks", options=locations,
+                                    default=locations)
+
+chart = water.chart_data(param, stat=stat, start=start_date, end=end_date,
+                         locations=selected_locations)
+
+if chart.empty:
+    st.info("No readings for this parameter in the selected range.")
+else:
+    st.line_chart(chart, width='stretch')
+
+    n_days = (end_date - start_date).days + 1
+    if len(chart) < n_days:
+        st.caption(f"Each point summarizes about {n_days // len(chart)} days")
+
+with st.expander("Weekly summary", expanded=False):
+    weekly = water.get_rollups('W')
+    weekly = weekly[(weekly['param'] == param) &
+                    (weekly['location'].isin(selected_locations))]
+    weekly = weekly.sort_values(['period', 'location'], ascending=[False, True])
+    st.dataframe(weekly[['period', 'location'] + water.rollup_stats + ['count']],
+                 width='stretch', hide_index=True)
+
+if st.button("Done and Logout"):
+    auth.sign_out()
+    st.rerun()
@@ -0,0 +1,58 @@
+import streamlit as st
+from datetime import datetime
+import logging
+
+import utils.dbfunctions as db
+import utils.census as census
+from utils.formatting import apply_custom_css
+import utils.auth as auth
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Page configuration
+st.set_page_config(page_title="Census", page_icon="🧮", layout="wide")
+
+db.stop_if_not_logged_in()
+
+apply_custom_css()
+
+st.title("🧮 Colony Census")
+st.subheader(f"Logged in as: {st.session_state.full_name}")
+
+st.info("Counts are reconstructed from recounts, splits and merges, deaths, tank moves "
+        "and terminal experiments, so they are only as good as those records.")
+
+datecol, bycol = st.columns([1, 3], gap='small')
+with datecol:
+    as_of_date = st.date_input("As of", value="today")
+with bycol:
+    group_by = st.multiselect("Count by", census.census_groupings,
+                              default=['species', 'system'])
+
+if not group_by:
+    st.warning("Select at least one way to group the counts")
+    st.stop()
+
+# count everything up to the end of the selected day
+as_of = datetime.combine(as_of_date, datetime.max.time())
+
+with st.spinner("Counting fish..."):
+    counts = census.get_census(as_of, by=group_by)
+
+if counts.empty:
+    st.info(f"No fish in the colony on {as_of_date}")
+else:
+    st.metric("Total fish", int(counts['fish'].sum()))
+    st.dataframe(counts, width='stretch', hide_index=True)
+
+    st.download_button(
+        label="📥 Download as CSV",
+        data=counts.to_csv(index=False),
+        file_name=f"census_{as_of_date}.csv",
+        mime="text/csv"
+    )
+
+if st.button("Done and Logout"):
+    auth.sign_out()
+    st.rerun()
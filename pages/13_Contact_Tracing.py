@@ -0,0 +1,85 @@
+import streamlit as st
+from datetime import datetime, timedelta
+import logging
+
+import utils.dbfunctions as db
+import utils.occupancy as occupancy
+from utils.formatting import apply_custom_css
+import utils.auth as auth
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Page configuration
+st.set_page_config(page_title="Contact Tracing", page_icon="🦠", layout="wide")
+
+db.stop_if_not_logged_in()
+
+apply_custom_css()
+
+st.title("🦠 Contact Tracing")
+st.subheader(f"Logged in as: {st.session_state.full_name}")
+
+fish_df = db.get_all_fish(include_dead=True, include_system_details=False, return_df=True)
+if fish_df.empty:
+    st.info("No fish in the database.")
+    st.stop()
+
+# sorted by status, so sick fish come first
+fish_ids = fish_df['id'].tolist()
+statuses = fish_df.set_index('id')['status']
+
+fishcol, startcol, endcol, bycol = st.columns([2, 1, 1, 1], gap='small')
+with fishcol:
+    fish_id = st.selectbox("Sick fish or group", fish_ids,
+                           format_func=lambda f: f"{f} ({statuses[f]})")
+with startcol:
+    start_date = st.date_input("From", value=datetime.now() - timedelta(days=30))
+with endcol:
+    end_date = st.date_input("To", value="today")
+with bycol:
+    by = st.radio("Shared", ['location', 'tank'],
+                  format_func=lambda b: 'System' if b == 'location' else 'Tank')
+
+start = datetime.combine(start_date, datetime.min.time())
+end = datetime.combine(end_date, datetime.max.time())
+
+with st.expander("Where this fish has been", expanded=False):
+    residency = occupancy.get_residency(fish_id)
+    if residency.empty:
+        st.info("No tank history for this fish")
+    else:
+        history = residency[['tank', 'system', 'start', 'end']].copy()
+        history['start'] = history['start'].dt.strftime('%Y-%m-%d')
+        history['end'] = history['end'].dt.strftime('%Y-%m-%d').where(~residency['is_current'], 'now')
+        st.dataframe(history, width='stretch', hide_index=True)
+
+with st.spinner("Finding contacts..."):
+    contacts = occupancy.find_contacts(fish_id, start, end, by=by)
+
+if contacts.empty:
+    st.success(f"No other fish shared a {'system' if by == 'location' else 'tank'} "
+               f"with {fish_id} in this period")
+else:
+    contacts = contacts.merge(fish_df[['id', 'status', 'tank']].rename(columns={'id': 'fish', 'tank': 'current_tank'}),
+                              on='fish', how='left')
+
+    alive = contacts[contacts['status'] != 'Dead']
+    st.metric("Live contacts", len(alive))
+
+    table = contacts.copy()
+    table['contact_start'] = table['contact_start'].dt.strftime('%Y-%m-%d')
+    table['contact_end'] = table['contact_end'].dt.strftime('%Y-%m-%d').fillna('now')
+    st.dataframe(table.rename(columns={'location': 'system'}), width='stretch', hide_index=True,
+                 column_config={'is_current': st.column_config.CheckboxColumn('Still together')})
+
+    st.download_button(
+        label="📥 Download as CSV",
+        data=table.to_csv(index=False),
+        file_name=f"contacts_{fish_id}_{start_date}_{end_date}.csv",
+        mime="text/csv"
+    )
+
+if st.button("Done and Logout"):
+    auth.sign_out()
+    st.rerun()
@@ -0,0 +1,59 @@
+import streamlit as st
+import logging
+
+import utils.dbfunctions as db
+import utils.integrity as integrity
+from utils.formatting import apply_custom_css
+import utils.auth as auth
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Page configuration
+st.set_page_config(page_title="Data Integrity", page_icon="🩺", layout="wide")
+
+db.stop_if_not_logged_in(min_access=5)
+
+apply_custom_css()
+
+st.title("🩺 Data Integrity")
+st.subheader(f"Logged in as: {st.session_state.full_name}")
+
+st.info("Checks the Fish, Tanks, Systems and Health tables for records that don't agree "
+        "with each other. Nothing is changed automatically.")
+
+rules = st.multiselect("Rules", list(integrity.integrity_rules.keys()),
+                       default=list(integrity.integrity_rules.keys()),
+                       format_func=lambda r: integrity.integrity_rules[r][1])
+
+if st.button("🔍 Run scan", type='primary'):
+    with st.spinner("Checking tables..."):
+        try:
+            tables = integrity.load_tables()
+            st.session_state.integrity_violations = integrity.scan(tables, rules=rules)
+        except Exception as e:
+            st.error(f"Database error: {e}")
+
+if 'integrity_violations' in st.session_state:
+    violations = st.session_state.integrity_violations
+
+    if violations.empty:
+        st.success("✅ No problems found")
+    else:
+        st.warning(f"⚠️ {len(violations)} problem(s) found")
+
+        for rule, rows in violations.groupby('rule', sort=False):
+            with st.expander(f"{integrity.integrity_rules[rule][1]} ({len(rows)})", expanded=False):
+                st.dataframe(rows[['table', 'key', 'problem', 'fix']],
+                             width='stretch', hide_index=True)
+
+        st.download_button(
+            label="📥 Download as CSV",
+            data=violations.to_csv(index=False),
+            file_name="integrity_report.csv",
+            mime="text/csv"
+        )
+
+if st.button("Done and Logout"):
+    auth.sign_out()
+    st.rerun()
@@ -0,0 +1,88 @@
+import streamlit as st
+from datetime import datetime, timedelta
+import logging
+
+import utils.dbfunctions as db
+import utils.timeline as timeline
+from utils.formatting import apply_custom_css
+import utils.auth as auth
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Page configuration
+st.set_page_config(page_title="Timeline", page_icon="🕒", layout="wide")
+
+db.stop_if_not_logged_in()
+
+apply_custom_css()
+
+st.title("🕒 Activity Timeline")
+st.subheader(f"Logged in as: {st.session_state.full_name}")
+
+rangecol, systemcol, personcol = st.columns(3, gap='small')
+
+with rangecol:
+    period = st.radio("Show", ["Today", "This week", "Custom"], horizontal=True)
+
+today = datetime.combine(datetime.now().date(), datetime.min.time())
+if period == "Today":
+    start, end = today, today + timedelta(days=1)
+elif period == "This week":
+    start, end = today - timedelta(days=today.weekday()), today + timedelta(days=1)
+else:
+    startcol, endcol = st.columns(2, gap='small')
+    with startcol:
+        start_date = st.date_input("Start date", value=today - timedelta(days=7))
+    with endcol:
+        end_date = st.date_input("End date", value="today")
+    start = datetime.combine(start_date, datetime.min.time())
+    end = datetime.combine(end_date, datetime.min.time()) + timedelta(days=1)
+
+with systemcol:
+    systems = [s['name'] for s in db.get_all_systems()]
+    system = st.selectbox("System", ["All"] + systems)
+with personcol:
+    people = [p['full_name'] for p in db.get_all_people()]
+    person = st.selectbox("Person", ["Everyone"] + people)
+
+tables = st.multiselect("Include", list(timeline.timeline_tables.keys()),
+                        default=list(timeline.timeline_tables.keys()))
+
+# go back to the first page whenever the filters change
+filter_key = (start, end, system, person, tuple(tables))
+if st.session_state.get('timeline_filters') != filter_key:
+    st.session_state.timeline_filters = filter_key
+    st.session_state.timeline_page = 0
+
+page = st.session_state.timeline_page
+
+with st.spinner("Loading events..."):
+    events, has_more = timeline.get_timeline(
+        start, end,
+        system=None if system == "All" else system,
+        person=None if person == "Everyone" else person,
+        tables=tables, page=page)
+
+if events.empty:
+    st.info("Nothing was logged in this period")
+else:
+    events['date'] = events['date'].dt.strftime('%a %Y-%m-%d %H:%M')
+    events['table'] = events['icon'] + ' ' + events['table']
+    st.dataframe(events.drop(columns='icon'), width='stretch', hide_index=True)
+
+prevcol, pagecol, nextcol = st.columns([1, 2, 1], gap='small')
+with prevcol:
+    if st.button("◀ Newer", disabled=page == 0):
+        st.session_state.timeline_page -= 1
+        st.rerun()
+with pagecol:
+    st.caption(f"Page {page + 1}")
+with nextcol:
+    if st.button("Older ▶", disabled=not has_more):
+        st.session_state.timeline_page += 1
+        st.rerun()
+
+if st.button("Done and Logout"):
+    auth.sign_out()
+    st.rerun()
@@ -0,0 +1,74 @@
+import streamlit as st
+from datetime import datetime, timedelta
+import time
+import logging
+
+import utils.dbfunctions as db
+from utils.formatting import apply_custom_css
+import utils.auth as auth
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Page configuration
+st.set_page_config(page_title="Search Notes", page_icon="🔎", layout="wide")
+
+db.stop_if_not_logged_in()
+
+apply_custom_css()
+
+st.title("🔎 Search Notes")
+st.subheader(f"Logged in as: {st.session_state.full_name}")
+
+source_icons = {
+    'Health': '💊',
+    'Feeding': '🍽️',
+    'Maintenance': '🧽',
+    'WaterQuality': '💧',
+    'Collections': '🎣',
+    'Experiments': '🔬'
+}
+
+search = st.text_input("Search", placeholder='e.g. fin rot, "white spots", ich or velvet')
+
+fishcol, systemcol, startcol, endcol = st.columns(4, gap='small')
+with fishcol:
+    fish = db.get_all_fish(include_dead=True, include_system_details=False)
+    fish_id = st.selectbox("Fish", ["Any"] + [f['id'] for f in fish])
+with systemcol:
+    systems = [s['name'] for s in db.get_all_systems()]
+    system = st.selectbox("System", ["Any"] + systems)
+with startcol:
+    use_dates = st.checkbox("Limit dates")
+    start_date = st.date_input("From", value=datetime.now() - timedelta(days=365),
+                               disabled=not use_dates)
+with endcol:
+    end_date = st.date_input("To", value="today", disabled=not use_dates)
+
+if search.strip():
+    start = end = None
+    if use_dates:
+        start = datetime.combine(start_date, datetime.min.time())
+        end = datetime.combine(end_date, datetime.min.time()) + timedelta(days=1)
+
+    t0 = time.perf_counter()
+    results = db.search_notes(search,
+                              fish_id=None if fish_id == "Any" else fish_id,
+                              system=None if system == "Any" else system,
+                              start=start, end=end)
+    elapsed = time.perf_counter() - t0
+
+    if results.empty:
+        st.info("No matching notes")
+    else:
+        st.caption(f"{len(results)} result(s) in {elapsed:.2f} s")
+        for hit in results.itertuples():
+            icon = source_icons.get(hit.source, '📝')
+            about = ' · '.join(str(x) for x in [hit.fish, hit.system] if x)
+            st.markdown(f"{icon} **{hit.source}** — {hit.date.strftime('%Y-%m-%d %H:%M')}"
+                        f"{' — ' + about if about else ''}")
+            st.markdown(f"> {hit.snippet}")
+
+if st.button("Done and Logout"):
+    auth.sign_out()
+    st.rerun()
@@ -0,0 +1,105 @@
+import streamlit as st
+import logging
+
+from utils.settings import health_statuses
+import utils.dbfunctions as db
+import utils.bulk as bulk
+from utils.formatting import apply_custom_css
+from utils.date_person import date_person_input
+import utils.auth as auth
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Page configuration
+st.set_page_config(page_title="Bulk Operations", page_icon="📦", layout="wide")
+
+db.stop_if_not_logged_in()
+
+apply_custom_css()
+
+st.title("📦 Bulk Operations")
+st.subheader(f"Logged in as: {st.session_state.full_name}")
+
+st.info("Quarantine a whole system, move a shelf of fish, or change the status of many fish at "
+        "once. Preview the changes first; they are saved all together or not at all.")
+
+fish_df = db.get_fish_summary(include_dead=False, return_df=True)
+tanks_df = db.get_all_tanks(return_df=True, only_active=True)
+
+if fish_df.empty or tanks_df.empty:
+    st.warning("No fish or tanks found in the database.")
+    st.stop()
+
+check_date, selected_person = date_person_input()
+
+st.divider()
+
+system_names = sorted(tanks_df['system'].dropna().unique())
+
+def shelves(system):
+    return sorted(tanks_df.loc[tanks_df['system'] == system, 'shelf'].dropna().unique())
+
+quarantine_tab, shelf_tab, status_tab = st.tabs(["Quarantine a system", "Move a shelf", "Change status"])
+
+with quarantine_tab:
+    system = st.selectbox("System", system_names, key='quarantine_system')
+    if st.button("Preview", key='preview_quarantine'):
+        st.session_state.bulk_plan = bulk.plan_quarantine(fish_df, system)
+        st.session_state.bulk_description = f"Quarantine every fish in {system}"
+
+with shelf_tab:
+    fromcol, tocol = st.columns(2, gap='large')
+    with fromcol:
+        from_system = st.selectbox("From system", system_names, key='move_from_system')
+        from_shelf = st.selectbox("From shelf", shelves(from_system), key='move_from_shelf')
+    with tocol:
+        to_system = st.selectbox("To system", system_names, key='move_to_system')
+        to_shelf = st.selectbox("To shelf", shelves(to_system), key='move_to_shelf')
+    st.caption("Each fish goes to the tank in the same position on the new shelf")
+
+    if st.button("Preview", key='preview_move'):
+        st.session_state.bulk_plan = bulk.plan_shelf_move(fish_df, tanks_df, from_system, from_shelf,
+                                                          to_system, to_shelf)
+        st.session_state.bulk_description = (f"Move shelf {from_shelf} of {from_system} "
+                                             f"to shelf {to_shelf} of {to_system}")
+
+with status_tab:
+    fish_ids = st.multiselect("Fish", fish_df['id'].tolist(), key='status_fish')
+    new_status = st.selectbox("New status",
+                              [s for s in health_statuses if s not in bulk.bulk_excluded_statuses],
+                              key='status_new')
+    st.caption("Record deaths one fish at a time in Health Details")
+    if st.button("Preview", key='preview_status'):
+        st.session_state.bulk_plan = bulk.plan_status_change(fish_df, fish_ids, new_status)
+        st.session_state.bulk_description = f"Change {len(fish_ids)} fish to {new_status}"
+
+if 'bulk_plan' in st.session_state:
+    st.divider()
+    st.markdown(f"#### {st.session_state.bulk_description}")
+
+    plan = st.session_state.bulk_plan
+    can_apply = bulk.show_plan(plan)
+
+    notes = st.text_input("Notes", key='bulk_notes')
+    applycol, cancelcol = st.columns(2, gap='small')
+    with applycol:
+        if st.button("Apply changes", type='primary', disabled=not can_apply):
+            if not selected_person:
+                st.error("Select a person")
+            else:
+                changed = bulk.apply_plan(plan, check_date, selected_person, notes=notes)
+                if changed is not None:
+                    del st.session_state.bulk_plan
+                    bulk.show_applied(changed)
+                else:
+                    st.warning("Nothing was changed. If the fish or tanks have changed since "
+                               "the preview, preview again.")
+    with cancelcol:
+        if st.button("Cancel"):
+            del st.session_state.bulk_plan
+            st.rerun()
+
+if st.button("Done and Logout"):
+    auth.sign_out()
+    st.rerun()
@@ -4,6 +4,8 @@ import logging
 
 from utils.settings import health_statuses, health_status_colors
 import utils.dbfunctions as db
+import utils.water as water
+import utils.prefetch as prefetch
 from utils.formatting import apply_custom_css
 from utils.date_person import date_person_input
 import utils.auth as auth
@@ -38,11 +40,17 @@ if not systems:
     st.warning("No tank systems found in the database.")
     st.stop()
 
+# start loading Check Fish while the water is checked
+prefetch.prefetch_next('Check Water')
+
 if 'submitted_system' not in st.session_state:
     st.session_state.submitted_system = set()
 
 st.divider()
 
+alerts = water.show_water_alerts(locations=list(systems.keys()))
+alert_locations = set(alerts['location']) if not alerts.empty else set()
+
 st.write("**Water Checks:**")
 
 for system, shortname in systems.items():
@@ -50,6 +58,8 @@ for system, shortname in systems.items():
     
     # Display fish info with tank and shelf
     info_text = f"**{system}**"
+    if system in alert_locations:
+        info_text = "⚠️ " + info_text
     st.write(info_text)
     
     condcol, pHcol, ammcol, nitritecol, nitratecol, waterxcol, notescol, logcol = \
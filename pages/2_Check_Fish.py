@@ -1,9 +1,11 @@
 import streamlit as st
 from datetime import datetime
 import logging
+import pandas as pd
 
 from utils.settings import health_statuses, health_status_colors
 import utils.dbfunctions as db
+import utils.prefetch as prefetch
 from utils.formatting import apply_custom_css
 from utils.date_person import date_person_input
 import utils.auth as auth
@@ -21,15 +23,17 @@ st.title("🐠 Check Fish")
 st.subheader(f"Logged in as: {st.session_state.full_name}")
 
 # Load fish data
-fish_data = db.get_all_fish(include_dead=False,
-                            return_df=True)
-tanks = db.get_all_tanks()
+fish_data = prefetch.get_prefetched('live fish summary')
+tanks = prefetch.get_prefetched('tanks')
 tanks = [t1['name'] for t1 in tanks]
 
 if fish_data.empty:
     st.warning("No fish found in the database.")
     st.stop()
 
+# start loading Health Details while the fish are checked
+prefetch.prefetch_next('Check Fish')
+
 if 'submitted_fish' not in st.session_state:
     st.session_state.submitted_fish = set()
 
@@ -38,9 +42,21 @@ check_date, selected_person = date_person_input()
 
 st.divider()
 
+# How long since each fish was fed and ate, and how many times in a row it refused food.
+# fish_summary only has the last check (and its own last_fed/last_ate flags),
+# so only the columns it doesn't have are taken from the feeding summary
+feeding_summary = prefetch.get_prefetched('feeding summary')
+fish_data = fish_data.merge(feeding_summary[['days_since_fed', 'days_since_ate', 'refusals']],
+                            left_on='id', right_index=True, how='left')
+fish_data['refusals'] = fish_data['refusals'].fillna(0).astype(int)
+
 # Sort fish based on user selection
-sort_by = st.selectbox('Sort by', ['Fish ID', 'Location'])
-if sort_by == "Location":
+sort_by = st.selectbox('Sort by', ['At risk', 'Fish ID', 'Location'])
+if sort_by == "At risk":
+    # most refusals first, then longest since they last ate (never ate is worst)
+    fish_data.sort_values(by = ['refusals', 'days_since_ate', 'id'],
+                          ascending=[False, False, True], na_position='first', inplace=True)
+elif sort_by == "Location":
     fish_data.sort_values(by = ['system', 'shelf', 'position_in_shelf'], inplace=True)
 else:  # sort by ID
     fish_data.sort_values(by = ['id'], inplace=True)
@@ -55,6 +71,14 @@ for fish_data1 in fish_data.itertuples():
     info_text = f"**Fish ID: {fish_id}**"
     if fish_data1.tank:
         info_text += f" | Tank: {fish_data1.tank}"
+    if pd.notna(fish_data1.days_since_ate):
+        info_text += f" | Last ate: {int(fish_data1.days_since_ate)} d ago"
+    else:
+        info_text += " | Last ate: never"
+    if pd.notna(fish_data1.days_since_fed):
+        info_text += f" | Last fed: {int(fish_data1.days_since_fed)} d ago"
+    if fish_data1.refusals > 0:
+        info_text += f" | ⚠️ Refused food {fish_data1.refusals}x in a row"
     
     st.write(info_text)
 
@@ -5,6 +5,9 @@ from copy import copy
 
 from utils.settings import health_statuses, health_status_colors
 import utils.dbfunctions as db
+import utils.lineage as lineage
+import utils.treatments as treatments
+import utils.prefetch as prefetch
 from utils.formatting import apply_custom_css
 from utils.date_person import date_person_input
 import utils.auth as auth
@@ -93,8 +96,13 @@ def get_update_status(fish_data1, key='update_status'):
 st.title("💊 Fish Health Details")
 st.subheader(f"Logged in as: {st.session_state.full_name}")
 
+treatments.show_active_treatments()
+
 # Load fish data
-fish_df = db.get_all_fish(return_df=True)
+fish_df = prefetch.get_prefetched('fish summary')
+
+# start loading Weekly Tasks while the health details are entered
+prefetch.prefetch_next('Health Details')
 
 if fish_df.empty:
     st.warning("No fish found in the database.")
@@ -168,7 +176,7 @@ if selected_fish_idx is not None:
         st.info("Record tank transfers and automatically update the fish's current location")
         
         # Get list of existing tanks without fish
-        tanks = db.get_all_tanks(only_active=False)
+        tanks = prefetch.get_prefetched('all tanks')
         tank_names = [t1['name'] for t1 in tanks if t1['fish'] is None or t1['number_in_group'] == 0]
         cur_tank = selected_fish['tank']
         tank_options = copy(tank_names)
@@ -342,6 +350,18 @@ if selected_fish_idx is not None:
             'Healthy': '🟢'
         }.get(selected_fish['status'], '⚪')
         st.metric("Status", f"{status_color} {selected_fish['status']}")
+
+    fish_treatments = prefetch.get_prefetched('treatment intervals')
+    fish_treatments = fish_treatments[fish_treatments['fish'] == selected_fish_id]
+    for treatment in fish_treatments[fish_treatments['is_open']].itertuples():
+        st.warning(f"💊 On treatment for {treatment.days} days "
+                   f"(since {treatment.start.strftime('%Y-%m-%d')}): {treatment.treatment}")
+    if not fish_treatments.empty and not fish_treatments['is_open'].all():
+        last = fish_treatments[~fish_treatments['is_open']].iloc[-1]
+        st.caption(f"Last treatment ended {last['end'].strftime('%Y-%m-%d')} "
+                   f"after {last['days']} days")
+
+    lineage.show_lineage(selected_fish_id)
     
     st.divider()
     
@@ -6,6 +6,7 @@ import pandas as pd
 
 from utils.settings import health_statuses, health_status_colors
 import utils.dbfunctions as db
+import utils.prefetch as prefetch
 from utils.formatting import apply_custom_css
 from utils.date_person import date_person_input
 import utils.auth as auth
@@ -24,9 +25,8 @@ st.title("📊 Recount Fish")
 st.subheader(f"Logged in as: {st.session_state.full_name}")
 
 # Load fish data
-fish_data = db.get_all_fish(include_dead=False, only_groups=True,
-                            return_df=True)
-tanks = db.get_all_tanks()
+fish_data = prefetch.get_prefetched('live groups')
+tanks = prefetch.get_prefetched('tanks')
 tanks = [t1['name'] for t1 in tanks]
 
 if fish_data.empty:
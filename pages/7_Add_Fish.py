@@ -93,6 +93,13 @@ with st.expander("📋 Add Tanks", expanded=False):
                     st.success("✅ New tanks added successfully!")
                     st.rerun()
 
+with st.expander("📜 Permit headcounts", expanded=False):
+    permits = db.get_permit_status(return_df=True)
+    if permits.empty:
+        st.info("No species found in the Species table")
+    else:
+        st.dataframe(permits, width='stretch', hide_index=True)
+
 collections = db.get_all_collections()
 # make it a set to ignore duplicates
 order_names = {c['name'] for c in collections if c['is_commercial']}
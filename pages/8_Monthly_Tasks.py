@@ -2,8 +2,9 @@ import streamlit as st
 from datetime import datetime
 import logging
 
-from utils.settings import health_statuses, health_status_colors
+from utils.settings import health_statuses, health_status_colors, monthly_tasks
 import utils.dbfunctions as db
+import utils.tasks as task_utils
 from utils.formatting import apply_custom_css
 from utils.date_person import date_person_input
 import utils.auth as auth
@@ -20,15 +21,14 @@ apply_custom_css()
 st.title("🗓️ Monthly Tasks")
 st.subheader(f"Logged in as: {st.session_state.full_name}")
 
-tasks = ['Change carbon',
-         'Change mechanical filter',
-         'Calibrate pH probe',
-         'Calibrate conductivity probe',
-         'Check alarm thresholds']
+tasks = list(monthly_tasks)
 
 systems = db.get_all_systems()
 system_names = [s1['name'] for s1 in systems]
 
+# when each task was last done for each system, and what is overdue
+task_status = task_utils.get_task_status(monthly_tasks, system_names)
+
 if 'completed_tasks' not in st.session_state:
     st.session_state.completed_tasks = set()
 
@@ -37,15 +37,21 @@ check_date, selected_person = date_person_input()
 
 st.divider()
 
+task_utils.show_task_status(task_status)
+
 st.write("**Tasks:**")
 
+# the systems and notes entered for each task, for "Done with all selected"
+selected = {}
+
 for task in tasks:
     is_done = task in st.session_state.completed_tasks
 
-    taskcol, notescol, systemcol, logcol = st.columns([2, 5, 1, 1], gap='small')
+    taskcol, notescol, systemcol, logcol = st.columns([2, 4, 2, 1], gap='small')
     
     with taskcol:
         st.markdown(f"**{task}**")
+        st.caption(task_utils.describe_task(task_status[task_status['task'] == task]))
 
     with notescol:
         notes = st.text_input(
@@ -57,23 +63,26 @@ for task in tasks:
         )
     
     with systemcol:
-        system = st.selectbox(
-            "System", 
-            options=[""] + system_names, 
-            key=f"system_{task}", 
+        task_systems = st.multiselect(
+            "Systems",
+            options=system_names,
+            key=f"system_{task}",
             label_visibility="collapsed",
+            placeholder="Systems",
             disabled=is_done
         )
 
+    if not is_done and task_systems:
+        selected[task] = (task_systems, notes)
+
     with logcol:
         if is_done:
             st.button("✓ Done", key=f"btn_{task}", disabled=True, use_container_width=True)
         else:
             if st.button("Done", key=f"btn_{task}", type="primary", use_container_width=True):
                 if selected_person:
-                    do_log = True
-                    
-                    if db.log_maintenance(check_date, selected_person, task, system, notes):
+                    if db.log_maintenance_bulk(check_date, selected_person,
+                                               [(task, task_systems, notes)]):
                         st.session_state.completed_tasks.add(task)
                         st.success(f"✅ Done")
                     else:
@@ -96,6 +105,18 @@ for task in tasks:
     
     st.divider()
 
+if st.button(f"Done with all selected ({len(selected)} task(s))", type="primary",
+             disabled=not selected):
+    if selected_person:
+        entries = [(task, task_systems, notes) for task, (task_systems, notes) in selected.items()]
+        if db.log_maintenance_bulk(check_date, selected_person, entries):
+            st.session_state.completed_tasks.update(selected)
+            st.rerun()
+        else:
+            st.error("Failed")
+    else:
+        st.error("Select a person")
+
 if st.button("Done and Logout"):
     auth.sign_out()
     st.rerun()
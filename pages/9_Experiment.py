@@ -4,6 +4,7 @@ import logging
 
 from utils.settings import health_statuses, health_status_colors
 import utils.dbfunctions as db
+import utils.lineage as lineage
 from utils.formatting import apply_custom_css
 from utils.date_person import date_person_input
 import utils.auth as auth
@@ -55,6 +56,8 @@ is_terminal = st.checkbox("Terminal Experiment")
 
 selected_fish_data = fish_data[fish_data['id'] == exp_fish].iloc[0]
 
+lineage.show_lineage(exp_fish)
+
 if selected_fish_data['number_in_group'] > 1:
     n_fish = st.number_input("Number of fish from this group used",
                              min_value=1,
@@ -0,0 +1,96 @@
+import argparse
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+root = Path(__file__).parent
+
+def get_pages():
+    """The app entry point and all the pages, in menu order"""
+    pages = sorted(root.glob('pages/*.py'),
+                   key=lambda p: int(p.stem.split('_')[0]) if p.stem.split('_')[0].isdigit() else 999)
+    return [root / 'app.py'] + pages
+
+def page_imports(path):
+    """The top level import statements of a page, as source code.
+
+    Only the imports are run, not the page itself, so this measures what a
+    cold server pays before the first line of the page executes."""
+    tree = ast.parse(path.read_text())
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return '\n'.join(ast.unparse(node) for node in imports)
+
+def profile(code):
+    """Run code in a new interpreter with -X importtime, and return the
+    cumulative time (in ms) of each module imported at the top level, plus
+    every module that was imported along the way"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=root, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    top_level = {}
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # nested imports are indented by two more spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        modules[name] = int(cumulative_us) / 1000
+        if depth == 0:
+            top_level[name] = int(cumulative_us) / 1000
+
+    return top_level, modules
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Report the cold start import cost of each Streamlit page',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('-p', '--page', action='append',
+                        help='Only profile pages whose file name contains this (can be given more than once)')
+    parser.add_argument('-n', '--top', type=int, default=5,
+                        help='Number of slowest modules to list for each page (default: 5)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Profile each page this many times and keep the fastest (default: 3)')
+    parser.add_argument('-m', '--module', action='append', default=[],
+                        help='Also report the time for this module on every page')
+
+    args = parser.parse_args()
+
+    pages = get_pages()
+    if args.page:
+        pages = [p for p in pages if any(s in p.name for s in args.page)]
+
+    # modules that the interpreter imports on startup, before the page's imports
+    startup = set(profile('pass')[0])
+
+    print(f"\n{'Page':<30} {'Imports (ms)':>12}")
+    print("-" * 50)
+    for path in pages:
+        code = page_imports(path)
+        try:
+            runs = [profile(code) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{path.name:<30} ✗ {e}")
+            continue
+
+        runs = [({k: v for k, v in top_level.items() if k not in startup}, modules)
+                for top_level, modules in runs]
+        top_level, modules = min(runs, key=lambda run: sum(run[0].values()))
+        print(f"{path.name:<30} {sum(top_level.values()):>12.0f}")
+
+        slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for name, ms in slowest:
+            print(f"    {name:<26} {ms:>12.0f}")
+        for name in args.module:
+            if name in modules:
+                print(f"    ({name}){'':<{max(24 - len(name), 0)}} {modules[name]:>12.0f}")
+            else:
+                print(f"    ({name} not imported)")
+
+if __name__ == '__main__':
+    main()
@@ -1,187 +1,209 @@
+import argparse
+import hashlib
+import json
 import sys
+from pathlib import Path
 import toml
-import sqlite3
 
-def load_db_password():
-    """Load database password from secrets.toml"""
+migrations_dir = Path(__file__).parent / 'migrations'
+
+# The queries that the data layer runs most often, as the SQL that PostgREST
+# sends for them. $n parameters stand in for the values; the plans are
+# generic, so the values don't matter.
+hot_queries = {
+    'get_all_fish': ('select * from "Fish" where status <> $1', ['text']),
+    'fish in a tank': ('select * from "Fish" where tank = $1', ['text']),
+    'get_fish_health_notes': ('select * from "Health" where fish = $1 and date >= $2 '
+                              'order by date desc', ['text', 'timestamp']),
+    'get_feeding_summary': ('select * from feeding_summary()', []),
+    'feeding for one fish': ('select * from "Feeding" where fish = $1 order by date desc limit 20',
+                             ['text']),
+    'water checks for a system': ('select * from "WaterQuality" where system = $1 and date >= $2 '
+                                  'order by date desc', ['text', 'timestamp']),
+    'get_maintenance_logs': ('select * from "Maintenance" where date >= $1 order by date desc',
+                             ['timestamp']),
+    'latest water check per system': ('select date from "WaterQuality" where system = $1 '
+                                      'order by date desc limit 1', ['text']),
+    'latest maintenance per task': ('select * from "Maintenance" where task = $1 and system = $2 '
+                                    'order by date desc limit 1', ['text', 'text']),
+    'get_latest_maintenance': ('select * from maintenance_latest where task = any($1)', ['text[]']),
+    'person from login': ('select full_name, login_id from "People" where login_id = $1', ['uuid']),
+    'person by name': ('select * from "People" where full_name = $1', ['text']),
+    'treatment and move events': ('select id, fish, date, event_type from "Health" '
+                                  'where event_type = $1', ['text']),
+    'lineage events': ('select * from "Groups" where event_type = $1', ['text']),
+}
+
+def load_database_url():
+    """Load the Postgres connection string from secrets.toml"""
     try:
         secrets = toml.load('.streamlit/secrets.toml')
-        return secrets['DB_PASSWORD']
+        return secrets['DATABASE_URL']
     except FileNotFoundError:
         print("✗ Error: .streamlit/secrets.toml file not found!")
-        print("  Please create the file with DB_PASSWORD key.")
+        print("  Please create the file with a DATABASE_URL key.")
         sys.exit(1)
     except KeyError:
-        print("✗ Error: DB_PASSWORD not found in secrets.toml!")
+        print("✗ Error: DATABASE_URL not found in secrets.toml!")
+        print("  Use the connection string from Project Settings → Database in Supabase.")
         sys.exit(1)
     except Exception as e:
         print(f"✗ Error loading secrets: {e}")
         sys.exit(1)
 
-def setup_database():
-    """Create and populate the Sqlite database with tables and foreign keys"""
-    
-    # Connect to sqlite (creates file if it doesn't exist)
-    conn = sqlite3.connect('fish.db')
-    cursor = conn.cursor()
-    
-    print("Creating database structure...")
-    
-    # Create Systems table (no foreign keys)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Systems (
-            Name TEXT PRIMARY KEY,
-            MaxVolume DOUBLE,
-            Active INTEGER
-        )
-    ''')
-    print("✓ Created Systems table")
-    
-    # Create Tanks table with foreign key to Systems
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Tanks (
-            Name TEXT PRIMARY KEY,
-            System TEXT,
-            Volume DOUBLE,
-            Shelf TEXT,
-            Divisions INTEGER,
-            Notes TEXT, 
-            FOREIGN KEY(System) REFERENCES Systems(Name)
-        )
-    ''')
-    print("✓ Created Tanks table with foreign key to Systems")
-
-    # Create Species table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Species (
-            Name TEXT PRIMARY KEY,
-            Common_name TEXT,
-            NumAllowed INTEGER,
-            Date_Approved DATE,
-            Date_Expires DATE,
-            Protocol TEXT
-        )
-    ''')
-    print("✓ Created Fish table with foreign key to Tanks")
-
-    # Create Fish table with foreign key to Tanks
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Fish (
-            ID TEXT PRIMARY KEY,
-            Tank TEXT,
-            Species TEXT,
-            Status TEXT,
-            FOREIGN KEY(Tank) REFERENCES Tanks(Name),
-            FOREIGN KEY(Species) REFERENCES Species(Name)
-        )
-    ''')
-    print("✓ Created Fish table with foreign key to Tanks")
-    
-    # Create People table for authentication
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS People (
-            Name TEXT PRIMARY KEY,
-            Username TEXT UNIQUE NOT NULL,
-            Password TEXT NOT NULL,
-            Access INTEGER DEFAULT 3,
-            Level TEXT,
-            Active BOOL,
-            Email TEXT,
-            NonTufts_Email TEXT,
-            MobilePhone TEXT,
-            Notes TEXT
-        )
-    ''')
-    print("✓ Created People table")
-
-    # Create Feeding table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Feeding (
-            Date DATETIME PRIMARY KEY,
-            Fish TEXT NOT NULL,
-            Fed BOOL,
-            Ate BOOL,
-            Notes TEXT,
-            Person TEXT,
-            FOREIGN KEY(Fish) REFERENCES Fish(ID),
-            FOREIGN KEY(Person) REFERENCES People(Name)
-        )
-    ''')
-    print("✓ Created Feeding table")
-
-    # Create Health table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Health (
-            Date DATETIME PRIMARY KEY,
-            Fish TEXT NOT NULL,
-            Notes TEXT,
-            StartTreatment TEXT,
-            EndTreatment TEXT,
-            FromTank TEXT,
-            ToTank TEXT,
-            ChangeStatus TEXT,
-            Person TEXT,
-            FOREIGN KEY(Fish) REFERENCES Fish(ID),
-            FOREIGN KEY(FromTank) REFERENCES Tanks(Name),
-            FOREIGN KEY(ToTank) REFERENCES Tanks(Name),
-            FOREIGN KEY(Person) REFERENCES People(Name)
-        )
-    ''')
-    print("✓ Created Health table")
-
-    # Create WaterQuality table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS WaterQuality (
-            Date DATETIME PRIMARY KEY,
-            System TEXT,
-            Tank TEXT,
-            Notes TEXT,
-            Conductivity DOUBLE,
-            pH DOUBLE,
-            Ammonia DOUBLE,
-            Nitrite DOUBLE,
-            Nitrate DOUBLE,
-            WaterChangePct DOUBLE,
-            Person TEXT,
-            FOREIGN KEY(System) REFERENCES Systems(Name),
-            FOREIGN KEY(Tank) REFERENCES Tanks(Name),
-            FOREIGN KEY(Person) REFERENCES People(Name)
-        )
-    ''')
-    print("✓ Created WaterQuality table")
-
-    # Create Maintenance table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Maintenance (
-            Date DATETIME PRIMARY KEY,
-            System TEXT,
-            Tank TEXT,
-            Task TEXT,
-            Notes TEXT,
-            Person TEXT,
-            FOREIGN KEY(System) REFERENCES Systems(Name),
-            FOREIGN KEY(Tank) REFERENCES Tanks(Name),
-            FOREIGN KEY(Person) REFERENCES People(Name)
-        )
-    ''')
-    print("✓ Created Maintenance table")
-
-    # Create Experiments table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Experiments (
-            Date DATETIME PRIMARY KEY,
-            Fish TEXT NOT NULL,
-            Details TEXT,
-            Person TEXT,
-            FOREIGN KEY(Fish) REFERENCES Fish(ID),
-            FOREIGN KEY(Person) REFERENCES People(Name)
+def connect():
+    """Connect directly to the Postgres database (not through the REST API)"""
+    # only needed by this script, so it isn't imported by the app
+    try:
+        import psycopg
+    except ImportError:
+        print("✗ Error: psycopg is not installed. Run: pip install 'psycopg[binary]'")
+        sys.exit(1)
+
+    try:
+        return psycopg.connect(load_database_url())
+    except Exception as e:
+        print(f"✗ Error: Could not connect to database: {e}")
+        sys.exit(1)
+
+def get_migrations():
+    """All the migration files, in order, as (version, name, path)"""
+    migrations = []
+    for path in sorted(migrations_dir.glob('*.sql')):
+        version, _, name = path.stem.partition('_')
+        migrations.append((version, name, path))
+    return migrations
+
+def checksum(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def get_applied(conn):
+    """Versions that have already been applied, with their checksums"""
+    conn.execute('''
+        create table if not exists schema_migrations (
+            version text primary key,
+            name text not null,
+            checksum text not null,
+            applied_at timestamptz not null default now()
         )
     ''')
-    print("✓ Created Maintenance table")
-    
     conn.commit()
-    conn.close()
-    print("\n✓ Database setup complete! File: fish.duckdb")
+    rows = conn.execute('select version, checksum from schema_migrations').fetchall()
+    return dict(rows)
+
+def migrate(conn, dry_run=False):
+    """Apply any migrations that haven't been applied yet, each in its own transaction"""
+    applied = get_applied(conn)
+
+    pending = [m for m in get_migrations() if m[0] not in applied]
+    if not pending:
+        print("✓ Database is up to date")
+        return
+
+    for version, name, path in pending:
+        if dry_run:
+            print(f"  would apply {version} {name}")
+            continue
+
+        try:
+            with conn.transaction():
+                conn.execute(path.read_text())
+                conn.execute('insert into schema_migrations (version, name, checksum) '
+                             'values (%s, %s, %s)', (version, name, checksum(path)))
+            print(f"✓ Applied {version} {name}")
+        except Exception as e:
+            print(f"✗ Error applying {version} {name}: {e}")
+            sys.exit(1)
+
+    if not dry_run:
+        print(f"\n✓ Applied {len(pending)} migration(s)")
+
+def status(conn):
+    """Show which migrations have been applied, and any that were edited afterwards"""
+    applied = get_applied(conn)
+
+    print(f"\n{'Version':<10} {'Name':<30} {'Status':<10}")
+    print("-" * 50)
+    for version, name, path in get_migrations():
+        if version not in applied:
+            state = 'pending'
+        elif applied[version] != checksum(path):
+            state = 'changed'
+        else:
+            state = 'applied'
+        print(f"{version:<10} {name:<30} {state:<10}")
+
+def _seq_scans(plan):
+    """Find the sequential scan nodes in an EXPLAIN (FORMAT JSON) plan"""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append((plan.get('Relation Name'), plan.get('Plan Rows')))
+    for child in plan.get('Plans', []):
+        found += _seq_scans(child)
+    return found
+
+def explain(conn):
+    """Report which of the hot queries would do a sequential scan"""
+    conn.execute("set plan_cache_mode = force_generic_plan")
+
+    n_scans = 0
+    for i, (name, (sql, types)) in enumerate(hot_queries.items()):
+        stmt = f'hot_query_{i}'
+        try:
+            conn.execute(f"prepare {stmt} ({', '.join(types)}) as {sql}")
+            nulls = ', '.join(['null'] * len(types))
+            plan = conn.execute(f"explain (format json) execute {stmt} ({nulls})").fetchone()[0]
+            conn.execute(f"deallocate {stmt}")
+        except Exception as e:
+            print(f"✗ {name}: {e}")
+            conn.rollback()
+            conn.execute("set plan_cache_mode = force_generic_plan")
+            continue
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans = _seq_scans(plan[0]['Plan'])
+        if scans:
+            n_scans += 1
+            tables = ', '.join(f"{table} (~{rows} rows)" for table, rows in scans)
+            print(f"✗ {name}: sequential scan on {tables}")
+        else:
+            print(f"✓ {name}")
+
+    print(f"\n{n_scans} of {len(hot_queries)} queries would do a sequential scan")
+    print("  (Postgres may still choose a sequential scan for very small tables)")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Create and update the fish database schema',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+
+    migrate_parser = subparsers.add_parser('migrate', help='Apply any pending migrations')
+    migrate_parser.add_argument('-n', '--dry-run', action='store_true',
+                                help='Only list the migrations that would be applied')
+
+    subparsers.add_parser('status', help='List migrations and whether they have been applied')
+    subparsers.add_parser('explain', help='Report which hot queries would do sequential scans')
+
+    args = parser.parse_args()
+
+    if args.command is None:
+        parser.print_help()
+        return
+
+    conn = connect()
+    try:
+        if args.command == 'migrate':
+            migrate(conn, dry_run=args.dry_run)
+        elif args.command == 'status':
+            status(conn)
+        elif args.command == 'explain':
+            explain(conn)
+    finally:
+        conn.close()
 
 if __name__ == '__main__':
-    setup_database()
+    main()
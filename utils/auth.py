@@ -1,30 +1,12 @@
 import streamlit as st
-from supabase import create_client, Client
 import logging
 
-import utils.dbfunctions as db
+from utils.client import get_supabase_client
+from utils.cache import invalidate
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-# Initialize Supabase client
-@st.cache_resource
-def init_supabase():
-    """Initialize Supabase client with credentials from secrets"""
-    url = st.secrets["supabase"]["url"]
-    key = st.secrets["supabase"]["key"]
-    return create_client(url, key)
-
-def get_supabase_client():
-    """Get Supabase client with current session"""
-    client = init_supabase()
-    
-    # If we have a session, set the auth header
-    if st.session_state.get('session'):
-        client.postgrest.auth(st.session_state.session.access_token)
-    
-    return client
-
 def sign_in(email: str, password: str):
     """Sign in an existing user"""
     try:
@@ -116,6 +98,7 @@ def add_update_person(full_name: str, level: str, phone: str, nontuftsemail: str
 
         logger.debug(f"sign_up: {add_person=}")
         if add_person.data:
+            invalidate('People')
             return True
         else:
             return False
@@ -0,0 +1,117 @@
+import streamlit as st
+import pandas as pd
+
+import utils.dbfunctions as db
+
+_plan_columns = ['fish', 'species', 'number_in_group', 'status', 'from_tank',
+                 'to_tank', 'new_status', 'problem']
+
+def _plan(fish, to_tank=None, new_status=None):
+    """A change set for the fish in the rows of fish (a fish summary frame)"""
+
+    plan = pd.DataFrame({
+        'fish': fish['id'],
+        'species': fish['species'],
+        'number_in_group': fish['number_in_group'],
+        'status': fish['status'],
+        'from_tank': fish['tank'],
+        'to_tank': to_tank,
+        'new_status': new_status,
+        'problem': None
+    })
+    return plan[_plan_columns].reset_index(drop=True)
+
+def plan_quarantine(fish, system):
+    """Put every live fish in a system into quarantine"""
+
+    in_system = fish[(fish['system'] == system) & (fish['status'] != 'Quarantine')]
+    return _plan(in_system, new_status='Quarantine')
+
+# statuses that can't be set in bulk. A death also takes the fish out of its
+# tank and records the cause, which is done one fish at a time in Health
+# Details (db.log_health_event)
+bulk_excluded_statuses = ['Dead']
+
+def plan_status_change(fish, fish_ids, new_status):
+    """Change the status of the selected fish"""
+
+    selected = fish[fish['id'].isin(fish_ids) & (fish['status'] != new_status)]
+    plan = _plan(selected, new_status=new_status)
+    if new_status in bulk_excluded_statuses:
+        plan['problem'] = f"Record {new_status.lower()} fish one at a time in Health Details"
+    return plan
+
+def plan_shelf_move(fish, tanks, system, shelf, to_system, to_shelf):
+    """Move the fish on one shelf to the tanks in the same positions on
+    another shelf. Fish whose position has no tank (or more than one) on the
+    new shelf, whose new tank would get fish from more than one tank, or whose
+    new tank already has fish that are not moving, are flagged as problems"""
+
+    on_shelf = fish[(fish['system'] == system) & (fish['shelf'] == shelf)]
+    targets = (tanks[(tanks['system'] == to_system) & (tanks['shelf'] == to_shelf)]
+               [['name', 'position_in_shelf']]
+               .dropna(subset=['position_in_shelf'])
+               .rename(columns={'name': 'to_tank'}))
+    shared_positions = targets.loc[targets['position_in_shelf'].duplicated(), 'position_in_shelf']
+
+    # a position with two tanks would list the fish twice
+    moving = (on_shelf.merge(targets, on='position_in_shelf', how='left')
+              .drop_duplicates('id'))
+    plan = _plan(moving, to_tank=moving['to_tank'].values)
+
+    plan.loc[plan['to_tank'].isna(), 'problem'] = 'No tank in this position on the new shelf'
+    plan.loc[moving['position_in_shelf'].isin(shared_positions).values, 'problem'] = \
+        'More than one tank in this position on the new shelf'
+
+    merged = plan.groupby('to_tank')['from_tank'].transform('nunique') > 1
+    plan.loc[merged, 'problem'] = 'Fish from more than one tank would go to this tank'
+
+    staying = fish[~fish['id'].isin(plan['fish'])]
+    occupied = plan['to_tank'].isin(staying['tank'])
+    plan.loc[occupied, 'problem'] = 'New tank already has fish'
+
+    plan.loc[plan['to_tank'] == plan['from_tank'], 'problem'] = 'Already in this tank'
+
+    return plan
+
+def show_plan(plan):
+    """Preview of a change set. Returns True if it can be applied"""
+
+    if plan.empty:
+        st.info("No fish would be changed")
+        return False
+
+    problems = plan['problem'].notna()
+    st.write(f"**{len(plan)} fish would be changed**")
+    preview = plan.drop(columns=['problem'] if not problems.any() else [])
+    st.dataframe(preview.fillna({'to_tank': '', 'new_status': ''}),
+                 hide_index=True, width='stretch')
+
+    if problems.any():
+        st.error(f"{problems.sum()} fish can't be changed. Fix the problems above and try again.")
+        return False
+    return True
+
+def apply_plan(plan, date_time, person, notes=None):
+    """Write a change set in one atomic call. The database checks that the
+    fish still have the tank and status shown in the preview, and that the
+    new tanks are still empty, and writes nothing if not.
+
+    Returns the fish that were changed, with their old and new tank and
+    status, or None if nothing was written"""
+
+    return db.apply_fish_changes(date_time, person, plan, notes=notes)
+
+def show_applied(changed):
+    """What a change set did, from the old and new values the database
+    returned for each fish"""
+
+    # fillna, since None != None
+    changed = changed.fillna({'old_tank': '', 'old_status': '', 'tank': '', 'status': ''})
+    moved = (changed['tank'] != changed['old_tank']).sum()
+    statuses = changed.loc[changed['status'] != changed['old_status']]
+    st.success(f"✅ Changed {len(changed)} fish: {moved} moved, "
+               f"{len(statuses)} changed status")
+    if not statuses.empty:
+        counts = statuses.groupby(['old_status', 'status']).size()
+        st.dataframe(counts.rename('fish').reset_index(), hide_index=True)
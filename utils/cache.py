@@ -0,0 +1,337 @@
+import streamlit as st
+import pandas as pd
+import threading
+import functools
+import inspect
+import io
+import json
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+import time
+import copy
+import logging
+
+from utils.settings import reference_cache_ttl, versioned_cache_ttl, version_poll_interval
+from utils.client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+class MemoryBackend:
+    """Keeps the cache in this process. Fine for a single server process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.versions = {}
+        self.synced = {}
+
+    def get(self, key):
+        with self.lock:
+            return self.entries.get(key)
+
+    def set(self, key, table, version, value):
+        with self.lock:
+            self.entries[key] = (table, version, time.time(), value)
+
+    def version(self, table):
+        with self.lock:
+            return self.versions.get(table, 0)
+
+    def bump(self, table):
+        with self.lock:
+            self.versions[table] = self.versions.get(table, 0) + 1
+            stale = [key for key, entry in self.entries.items() if entry[0] == table]
+            for key in stale:
+                del self.entries[key]
+
+    def mark_synced(self, table, db_version):
+        """Record the database version of a table. True if it is newer than
+        the one recorded before"""
+        with self.lock:
+            if db_version <= self.synced.get(table, 0):
+                return False
+            self.synced[table] = db_version
+            return True
+
+    def list_entries(self):
+        with self.lock:
+            return [(key, table, version, stored)
+                    for key, (table, version, stored, _) in self.entries.items()]
+
+def _dumps(value):
+    """Serialize a cached value as JSON text. DataFrames keep their column
+    types and index (orient='table'). Not pickle: anything that can write the
+    cache file could then run code in the app when a value is loaded"""
+    if isinstance(value, pd.DataFrame):
+        return json.dumps({'frame': value.to_json(orient='table', date_format='iso')})
+    return json.dumps({'value': value}, default=str)
+
+def _loads(text):
+    stored = json.loads(text)
+    if 'frame' in stored:
+        return pd.read_json(io.StringIO(stored['frame']), orient='table')
+    return stored['value']
+
+class SQLiteBackend:
+    """Keeps the cache in an SQLite file, so that every server process on the
+    same machine shares it. Each table has a version stamp; a write in any
+    process bumps it, which makes every process ignore the old entries.
+
+    The file is only readable and writable by the user running the app, in a
+    directory that is created private if it doesn't exist yet"""
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if os.path.exists(self.path) and os.stat(self.path).st_uid != os.getuid():
+            raise PermissionError(f"Cache file {self.path} belongs to another user")
+
+        with self._connect() as conn:
+            conn.execute('pragma journal_mode=wal')
+            # entries from before values were stored as JSON
+            columns = conn.execute('pragma table_info(cache_entries)').fetchall()
+            if any(name == 'value' and kind.lower() == 'blob' for _, name, kind, *_ in columns):
+                conn.execute('drop table cache_entries')
+            conn.execute('''create table if not exists cache_entries (
+                                key text primary key,
+                                tbl text not null,
+                                version integer not null,
+                                stored_at real not null,
+                                value text not null)''')
+            conn.execute('''create table if not exists table_versions (
+                                tbl text primary key,
+                                version integer not null)''')
+            conn.execute('''create table if not exists synced_versions (
+                                tbl text primary key,
+                                version integer not null)''')
+        os.chmod(self.path, 0o600)
+
+    @contextmanager
+    def _connect(self):
+        # a new connection each time, since sqlite connections can't be
+        # shared between threads. Committed and closed at the end of the block
+        with closing(sqlite3.connect(self.path, timeout=5)) as conn:
+            with conn:
+                yield conn
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute('select tbl, version, stored_at, value from cache_entries where key = ?',
+                               (repr(key),)).fetchone()
+        if row is None:
+            return None
+        table, version, stored, value = row
+        return table, version, stored, _loads(value)
+
+    def set(self, key, table, version, value):
+        with self._connect() as conn:
+            conn.execute('insert or replace into cache_entries values (?, ?, ?, ?, ?)',
+                         (repr(key), table, version, time.time(), _dumps(value)))
+
+    def version(self, table):
+        with self._connect() as conn:
+            row = conn.execute('select version from table_versions where tbl = ?',
+                               (table,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, table):
+        with self._connect() as conn:
+            conn.execute('''insert into table_versions values (?, 1)
+                            on conflict (tbl) do update set version = version + 1''', (table,))
+            conn.execute('delete from cache_entries where tbl = ?', (table,))
+
+    def mark_synced(self, table, db_version):
+        """Record the database version of a table. True if it is newer than
+        the one recorded before; only one process gets True for each change"""
+        with self._connect() as conn:
+            cursor = conn.execute('''insert into synced_versions values (?, ?)
+                                     on conflict (tbl) do update set version = excluded.version
+                                     where excluded.version > synced_versions.version''',
+                                  (table, db_version))
+            return cursor.rowcount > 0
+
+    def list_entries(self):
+        with self._connect() as conn:
+            return conn.execute('select key, tbl, version, stored_at from cache_entries').fetchall()
+
+cache_backends = {
+    'memory': MemoryBackend,
+    'sqlite': SQLiteBackend
+}
+
+@st.cache_resource
+def _shared_cache():
+    """The cache backend, chosen in secrets.toml:
+
+        [cache]
+        backend = "sqlite"                  # or "memory" (the default)
+        path = "~/.cache/fishdb/cache.sqlite"   # in a directory only the app's user can write
+
+    plus hit and miss counts for this process, and when the table versions
+    were last checked"""
+    try:
+        config = dict(st.secrets.get('cache', {}))
+    except Exception:
+        config = {}
+
+    name = config.pop('backend', 'memory')
+    try:
+        backend = cache_backends[name](**config)
+    except Exception as e:
+        logger.warning(f"Could not start {name} cache backend ({e}), using memory")
+        name, backend = 'memory', MemoryBackend()
+
+    logger.info(f"Using {name} cache backend")
+    return {'backend': backend, 'name': name,
+            'lock': threading.Lock(), 'hits': 0, 'misses': 0,
+            'last_sync': 0, 'versioned': False}
+
+def _count(cache, which):
+    with cache['lock']:
+        cache[which] += 1
+
+def _copy(value):
+    # callers are free to change what they get back, so they never get the
+    # cached object itself
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    return copy.deepcopy(value)
+
+def is_empty(value):
+    """True for an empty DataFrame, list or dict, which is also what the read
+    functions return after a database error"""
+    if isinstance(value, pd.DataFrame):
+        return value.empty
+    return not value
+
+def shared(table, ttl=None):
+    """Decorator for read functions whose result only depends on their
+    arguments and on one table. The result is kept for ttl seconds (or
+    versioned_cache_ttl/reference_cache_ttl) in a cache shared by every
+    session, and by every server process if the backend is shared, until
+    invalidate(table) is called or the table's version changes.
+
+    Empty results are not kept, since that is also what the read functions
+    return after a database error."""
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (table, func.__name__, tuple(bound.arguments.items()))
+
+            cache = _shared_cache()
+            backend = cache['backend']
+            try:
+                version = backend.version(table)
+                entry = backend.get(key)
+            except Exception as e:
+                logger.warning(f"Cache read failed: {e}")
+                return func(*args, **kwargs)
+
+            # tables can be kept much longer when changes are seen through their versions
+            max_age = ttl or (versioned_cache_ttl if cache['versioned'] else reference_cache_ttl)
+            if entry is not None and entry[1] == version and time.time() - entry[2] < max_age:
+                _count(cache, 'hits')
+                return _copy(entry[3])
+
+            _count(cache, 'misses')
+            value = func(*args, **kwargs)
+
+            # the result is stored with the version from before the read, so
+            # if the table changed while it was being read it is never used
+            if not is_empty(value):
+                try:
+                    backend.set(key, table, version, value)
+                except Exception as e:
+                    logger.warning(f"Cache write failed: {e}")
+            return _copy(value)
+
+        wrapper.table = table
+        return wrapper
+
+    return decorator
+
+def invalidate(*tables):
+    """Drop every cached result that was read from these tables"""
+
+    backend = _shared_cache()['backend']
+    for table in tables:
+        try:
+            backend.bump(table)
+        except Exception as e:
+            logger.warning(f"Could not invalidate cached {table}: {e}")
+    logger.debug(f"Invalidated cached results for {', '.join(tables)}")
+
+def table_version(table):
+    """The current version stamp of a table in the shared cache. It changes
+    whenever invalidate(table) is called or the table changes in the database"""
+
+    try:
+        return _shared_cache()['backend'].version(table)
+    except Exception as e:
+        logger.warning(f"Could not read version of {table}: {e}")
+        return None
+
+def sync_table_versions():
+    """Check the table_versions table in the database (one small request) and
+    invalidate the cached tables that have changed since the last check,
+    including changes made outside the app. Called once per rerun, but only
+    goes to the database every version_poll_interval seconds per process.
+
+    Returns False if the database has no table_versions table, in which case
+    cached tables just expire after reference_cache_ttl"""
+
+    cache = _shared_cache()
+    with cache['lock']:
+        if time.time() - cache['last_sync'] < version_poll_interval:
+            return cache['versioned']
+        cache['last_sync'] = time.time()
+
+    try:
+        supabase = get_supabase_client()
+        response = supabase.table('table_versions').select('table_name, version').execute()
+    except Exception as e:
+        if cache['versioned']:
+            logger.warning(f"Could not check table versions: {e}")
+        cache['versioned'] = False
+        return False
+
+    backend = cache['backend']
+    for row in response.data:
+        try:
+            if backend.mark_synced(row['table_name'], row['version']):
+                backend.bump(row['table_name'])
+        except Exception as e:
+            logger.warning(f"Could not sync version of {row['table_name']}: {e}")
+
+    cache['versioned'] = True
+    return True
+
+def cache_stats():
+    """What is in the shared cache, and how often it has been used by this process"""
+
+    cache = _shared_cache()
+    now = time.time()
+    try:
+        listed = cache['backend'].list_entries()
+    except Exception as e:
+        logger.warning(f"Could not list cache entries: {e}")
+        listed = []
+
+    entries = pd.DataFrame([{'table': table,
+                             'entry': str(key),
+                             'version': version,
+                             'age (s)': round(now - stored)}
+                            for key, table, version, stored in listed],
+                           columns=['table', 'entry', 'version', 'age (s)'])
+    return entries, cache['hits'], cache['misses']
+
+def cache_backend_name():
+    return _shared_cache()['name']
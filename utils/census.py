@@ -0,0 +1,206 @@
+import streamlit as st
+import pandas as pd
+import logging
+from bisect import bisect_right
+
+import utils.dbfunctions as db
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# how often to store a copy of the colony state while replaying events
+snapshot_interval = pd.Timedelta(days=30)
+
+# order to apply events that have the same time stamp
+_event_order = {'arrive': 0, 'transfer': 1, 'count': 2, 'move': 3, 'remove': 4, 'zero': 5}
+
+census_groupings = ['species', 'system', 'tank', 'collection']
+
+def _load_events():
+    """Read the Fish, Groups, Health and Experiments tables and turn them into
+    one date-ordered list of events, plus the Fish and Tanks details needed to
+    label the counts"""
+
+    fish = db.get_all_fish(include_dead=True, include_system_details=False, as_csv=True)
+    collections = db.get_all_from_table('Collections', as_csv=True)
+    groups = db.get_all_from_table('Groups', as_csv=True)
+    health = db.get_all_from_table('Health', as_csv=True)
+    experiments = db.get_all_from_table('Experiments', as_csv=True)
+    tanks = db.get_all_tanks(return_df=True)
+
+    for df in [collections, groups, health, experiments]:
+        if not df.empty:
+            df['date'] = db.naive_dates(df['date'])
+
+    events = []
+    def add(date, kind, fish_id, value=None):
+        if pd.notna(date) and pd.notna(fish_id):
+            events.append((date, _event_order[kind], kind, fish_id, value))
+
+    # absolute counts, and terminal experiments that take fish out of a group
+    counts = pd.DataFrame(columns=['date', 'fish', 'number'])
+    if not groups.empty:
+        is_count = groups['event_type'].isin(['Recount', 'Confirm Number'])
+        counts = groups.loc[is_count, ['date', 'original_group', 'number_in_group']]
+        counts.columns = ['date', 'fish', 'number']
+    removals = pd.DataFrame(columns=['date', 'fish', 'number'])
+    if not experiments.empty:
+        terminal = experiments[experiments['is_terminal'].fillna(False).astype(bool)]
+        removals = terminal[['date', 'fish', 'n_fish']].fillna({'n_fish': 1})
+        removals.columns = ['date', 'fish', 'number']
+
+    # split and merge events
+    splits = []
+    merges = []
+    if not groups.empty:
+        group_cols = [c for c in groups.columns if c.startswith('group_')]
+        for row in groups[groups['event_type'].isin(['Split Group', 'Merge Groups'])].itertuples():
+            members = [getattr(row, c) for c in group_cols if pd.notna(getattr(row, c))]
+            if row.event_type == 'Split Group':
+                splits += [(row.date, row.original_group, m) for m in members if m != row.original_group]
+            else:
+                merges += [(row.date, m, row.new_group) for m in members]
+    split_parent = {child: (date, parent) for date, parent, child in splits}
+    merge_date = {new: date for date, old, new in merges}
+
+    # when each fish arrived
+    collection_dates = collections.set_index('id')['date'] if not collections.empty else pd.Series(dtype=object)
+    arrival = fish['collection'].map(collection_dates)
+    arrival.index = fish['id']
+    for child, (date, parent) in split_parent.items():
+        arrival[child] = date
+    for new, date in merge_date.items():
+        arrival[new] = date
+
+    # starting number for each fish: its first recount if it has one, otherwise
+    # its current number, plus anything removed or split off before that point
+    first_count = counts.sort_values('date').drop_duplicates('fish').set_index('fish')
+    current = fish.set_index('id')['number_in_group']
+    current = current.where(current > 0, 1).fillna(1)
+
+    initial = {}
+    for fish_id in arrival.sort_values(ascending=False, na_position='first').index:
+        if fish_id in first_count.index:
+            base = first_count.loc[fish_id, 'number']
+            base = 1 if pd.isna(base) else base
+            until = first_count.loc[fish_id, 'date']
+        else:
+            base = current.get(fish_id, 1)
+            until = pd.Timestamp.max
+        removed = removals.loc[(removals['fish'] == fish_id) & (removals['date'] < until), 'number'].sum()
+        split_off = sum(initial.get(child, 0) for date, parent, child in splits
+                        if parent == fish_id and date < until)
+        initial[fish_id] = int(base + removed + split_off)
+
+    # where each fish started: where its first move was from, or where it is
+    # now, or, for fish that died in place (which clears their tank), the tank
+    # recorded with their death, as in occupancy.build_residency
+    moves = pd.DataFrame(columns=['date', 'fish', 'from_tank', 'to_tank'])
+    deaths = pd.DataFrame(columns=['date', 'fish', 'from_tank'])
+    if not health.empty:
+        moves = health.loc[health['event_type'] == 'Tank Move', ['date', 'fish', 'from_tank', 'to_tank']]
+        is_death = (health['event_type'] == 'Death') | (health['change_status'] == 'Dead')
+        deaths = health.loc[is_death, ['date', 'fish', 'from_tank']]
+    first_tank = moves.sort_values('date').drop_duplicates('fish').set_index('fish')['from_tank']
+    death_tank = (deaths.dropna(subset=['from_tank']).sort_values('date')
+                  .groupby('fish')['from_tank'].first())
+    start_tank = fish.set_index('id')['tank'].copy()
+    start_tank.update(first_tank)
+    start_tank = start_tank.fillna(death_tank.reindex(start_tank.index))
+
+    first_date = min([df['date'].min() for df in [collections, groups, health, experiments]
+                      if not df.empty] or [pd.Timestamp.now()])
+    for fish_id, date in arrival.items():
+        if pd.isna(date):
+            date = first_date
+        add(date, 'arrive', fish_id, (initial.get(fish_id, 1), start_tank.get(fish_id)))
+
+    for date, parent, child in splits:
+        add(date, 'transfer', parent, initial.get(child, 0))
+    for date, old, new in merges:
+        add(date, 'zero', old)
+    for row in counts.itertuples():
+        add(row.date, 'count', row.fish, row.number)
+    for row in removals.itertuples():
+        add(row.date, 'remove', row.fish, row.number)
+    for row in moves.itertuples():
+        add(row.date, 'move', row.fish, row.to_tank)
+    for row in deaths.itertuples():
+        add(row.date, 'zero', row.fish)
+
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    details = fish.set_index('id')[['species', 'collection']]
+    systems = tanks.set_index('name')['system'] if not tanks.empty else pd.Series(dtype=object)
+    return events, details, systems
+
+def _apply(state, event):
+    date, _, kind, fish_id, value = event
+    if kind == 'arrive':
+        state[fish_id] = list(value)
+    elif fish_id not in state:
+        return
+    elif kind == 'count':
+        state[fish_id][0] = value
+    elif kind in ('remove', 'transfer'):
+        state[fish_id][0] = max(state[fish_id][0] - value, 0)
+    elif kind == 'zero':
+        state[fish_id][0] = 0
+    elif kind == 'move':
+        state[fish_id][1] = value
+
+@st.cache_resource(ttl=600)
+def get_census_engine():
+    """Replay every event once, storing a copy of the state (number and tank
+    of each fish) every snapshot_interval. Rebuilt at most every 10 minutes"""
+
+    events, details, systems = _load_events()
+
+    snapshots = [(pd.Timestamp.min, 0, {})]
+    state = {}
+    next_snapshot = events[0][0] + snapshot_interval if events else None
+    for i, event in enumerate(events):
+        while next_snapshot is not None and event[0] >= next_snapshot:
+            snapshots.append((next_snapshot, i, {k: list(v) for k, v in state.items()}))
+            next_snapshot += snapshot_interval
+        _apply(state, event)
+
+    logger.debug(f"Census: replayed {len(events)} events into {len(snapshots)} snapshots")
+    return {'events': events, 'snapshots': snapshots,
+            'details': details, 'systems': systems}
+
+def get_state_as_of(as_of):
+    """Get the number and tank of every fish on a date, replaying events
+    forward from the nearest earlier snapshot"""
+
+    engine = get_census_engine()
+    as_of = pd.Timestamp(as_of)
+    snapshots = engine['snapshots']
+    events = engine['events']
+
+    i = bisect_right([s[0] for s in snapshots], as_of) - 1
+    _, start, saved = snapshots[i]
+    state = {k: list(v) for k, v in saved.items()}
+    for event in events[start:]:
+        if event[0] > as_of:
+            break
+        _apply(state, event)
+
+    census = pd.DataFrame([(k, v[0], v[1]) for k, v in state.items()],
+                          columns=['fish', 'number', 'tank'])
+    census = census[census['number'] > 0]
+    census['number'] = census['number'].astype(int)
+    census = census.join(engine['details'], on='fish')
+    census['system'] = census['tank'].map(engine['systems'])
+    return census
+
+def get_census(as_of, by=('species', 'system')):
+    """Count the fish on a date, grouped by any of species, system, tank and collection"""
+
+    census = get_state_as_of(as_of)
+    if census.empty:
+        return pd.DataFrame(columns=list(by) + ['groups', 'fish'])
+
+    return (census.groupby(list(by), dropna=False)
+            .agg(groups=('fish', 'count'), fish=('number', 'sum'))
+            .reset_index())
@@ -0,0 +1,78 @@
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# access token of the user that a background job is working for (see
+# background_session)
+_background_token = ContextVar('background_token', default=None)
+
+# Initialize Supabase client
+@st.cache_resource
+def init_supabase():
+    """Initialize Supabase client with credentials from secrets"""
+    # supabase pulls in a lot of modules (httpx, realtime, storage, ...), so
+    # it is only imported when the first client is made
+    from supabase import create_client
+
+    url = st.secrets["supabase"]["url"]
+    key = st.secrets["supabase"]["key"]
+    return create_client(url, key)
+
+@st.cache_resource
+def init_background_supabase():
+    """Client for work done in the background for no user in particular (e.g.
+    warming up the caches). Its results go into caches that every session
+    shares, so it must not be able to read more than a logged in user can.
+
+    It uses the anon key with no login, or a background_key in the
+    [supabase] secrets for a role that can read the lab's tables but not
+    write them. Never the service key, which bypasses row level security"""
+    from supabase import create_client
+
+    url = st.secrets["supabase"]["url"]
+    key = st.secrets["supabase"].get("background_key", st.secrets["supabase"]["key"])
+    return create_client(url, key)
+
+@st.cache_resource(max_entries=50, ttl=3600)
+def _session_client(access_token):
+    """Client for background work done for one user, logged in as that user.
+    A separate client per token, so it doesn't change the auth header of the
+    client the sessions share"""
+    from supabase import create_client
+
+    client = create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
+    client.postgrest.auth(access_token)
+    return client
+
+@contextmanager
+def background_session(access_token):
+    """Make get_supabase_client use this user's login in a background thread,
+    for the code run inside the with block"""
+    reset = _background_token.set(access_token)
+    try:
+        yield
+    finally:
+        _background_token.reset(reset)
+
+def get_supabase_client():
+    """Get Supabase client with current session"""
+    if get_script_run_ctx(suppress_warning=True) is None:
+        # background thread: there is no session to take the login from,
+        # unless the job was started with background_session
+        access_token = _background_token.get()
+        if access_token is not None:
+            return _session_client(access_token)
+        return init_background_supabase()
+
+    client = init_supabase()
+
+    # If we have a session, set the auth header
+    if st.session_state.get('session'):
+        client.postgrest.auth(st.session_state.session.access_token)
+
+    return client
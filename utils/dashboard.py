@@ -0,0 +1,67 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+
+import utils.dbfunctions as db
+from utils.settings import health_statuses, water_check_days, permit_warning_days
+
+def _format_dates(df, columns):
+    df = df.copy()
+    for column in columns:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], format='ISO8601').dt.strftime('%Y-%m-%d %H:%M')
+    return df
+
+def show_dashboard():
+    """Landing dashboard for the home page: fish by status and what needs
+    doing today. All of it comes from one database call"""
+
+    summary = db.get_dashboard_summary(datetime.now().date())
+
+    counts = summary['status_counts']
+    if not counts.empty:
+        counts = counts.set_index('status')
+        order = [s for s in health_statuses if s in counts.index]
+        order += [s for s in counts.index if s not in order]
+        columns = st.columns(len(order))
+        for col, status in zip(columns, order):
+            with col:
+                st.metric(status, int(counts.loc[status, 'fish']),
+                          help=f"{int(counts.loc[status, 'animals'])} animals")
+
+    water_overdue = summary['water_overdue']
+    unchecked = summary['unchecked_today']
+    attention = summary['needs_attention']
+    treatments = summary['open_treatments']
+    permits = summary['permits_expiring']
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Water checks due", len(water_overdue))
+    col2.metric("Fish not checked today", len(unchecked))
+    col3.metric("Open treatments", len(treatments))
+    col4.metric("Permits expiring", len(permits))
+
+    if not attention.empty:
+        with st.expander(f"🟠 {len(attention)} sick or quarantined fish"):
+            st.dataframe(_format_dates(attention, ['last_health_date']),
+                         hide_index=True, width='stretch')
+
+    if not water_overdue.empty:
+        with st.expander(f"💧 Water not checked in the last {water_check_days} day(s)"):
+            water_overdue = _format_dates(water_overdue, ['last_check'])
+            st.dataframe(water_overdue.fillna({'last_check': 'never'}),
+                         hide_index=True, width='stretch')
+
+    if not unchecked.empty:
+        with st.expander(f"🐠 {len(unchecked)} fish not checked today"):
+            st.dataframe(_format_dates(unchecked, ['last_check']),
+                         hide_index=True, width='stretch')
+
+    if not treatments.empty:
+        with st.expander(f"💊 {len(treatments)} open treatment(s)"):
+            st.dataframe(_format_dates(treatments, ['treatment_start']),
+                         hide_index=True, width='stretch')
+
+    if not permits.empty:
+        with st.expander(f"📄 Permits expiring in the next {permit_warning_days} days"):
+            st.dataframe(permits, hide_index=True, width='stretch')
@@ -1,13 +1,18 @@
 import hashlib
-from supabase import create_client, Client
 import streamlit as st
 import pandas as pd
 import logging
 from datetime import datetime, timedelta
 import re
-from copy import copy
+import io
+import threading
+import functools
+import inspect
+from copy import copy, deepcopy
 
-from utils.auth import get_supabase_client
+from utils.client import get_supabase_client
+from utils.cache import shared, invalidate, sync_table_versions
+from utils.settings import dashboard_cache_ttl, water_check_days, permit_warning_days
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -37,6 +42,9 @@ def stop_if_not_logged_in(min_access = 0):
         st.info("Use the sidebar to navigate back to the Login page.")
         st.stop()
     else:
+        # one small request to find out which cached tables are stale
+        sync_table_versions()
+
         people = get_all_people()
         access = [p1['access'] for p1 in people if p1['full_name'] == st.session_state.full_name]
         if len(access) != 1:
@@ -60,6 +68,179 @@ def flatten_dict_list(d):
 
     return F
 
+# Columns that hold text keys even when the values look like numbers (e.g. fish "012").
+# Used to keep pandas from guessing the wrong type when parsing CSV responses.
+csv_text_columns = ['fish', 'tank', 'from_tank', 'to_tank', 'species', 'system',
+                    'original_group', 'new_group', 'group_1', 'group_2', 'group_3', 'group_4',
+                    'by', 'name', 'task', 'notes']
+
+# The type of each column that isn't text, per table (see migrations/0001_baseline.sql).
+# CSV pages are cast to these, so that every page of a table has the same
+# columns types whatever values happen to be on it (e.g. a page where a
+# boolean or integer column is all empty)
+table_schemas = {
+    'Fish': {'id': 'str', 'number_in_group': 'Int64', 'collection': 'Int64'},
+    'Tanks': {'volume': 'float64', 'shelf': 'Int64', 'position_in_shelf': 'Int64',
+              'is_hospital': 'boolean', 'active': 'boolean'},
+    'Systems': {'volume': 'float64', 'active': 'boolean'},
+    'Species': {'num_allowed': 'Int64'},
+    'Locations': {'id': 'Int64'},
+    'People': {'id': 'Int64', 'access': 'Int64', 'active': 'boolean'},
+    'Collections': {'id': 'Int64', 'latitude': 'float64', 'longitude': 'float64',
+                    'seine_length': 'float64', 'number_of_tries': 'Int64',
+                    'water_temp': 'float64', 'water_conductivity': 'float64',
+                    'water_ph': 'float64', 'water_flow_speed': 'float64',
+                    'is_commercial': 'boolean'},
+    'Feeding': {'id': 'Int64', 'fed': 'boolean', 'ate': 'boolean'},
+    'Health': {'id': 'Int64'},
+    'WaterQuality': {'id': 'Int64', 'conductivity': 'float64', 'ph': 'float64',
+                     'ammonia': 'float64', 'nitrite': 'float64', 'nitrate': 'float64',
+                     'water_change_pct': 'float64'},
+    'Maintenance': {'id': 'Int64'},
+    'Groups': {'id': 'Int64', 'number_in_group': 'Int64'},
+    'Experiments': {'id': 'Int64', 'is_terminal': 'boolean', 'n_fish': 'Int64'},
+}
+
+# The columns of each table (see migrations/0001_baseline.sql), for the
+# frames returned when a CSV response is empty and has no header line
+table_columns = {
+    'Systems': ['name', 'volume', 'active', 'notes'],
+    'Tanks': ['name', 'system', 'volume', 'shelf', 'position_in_shelf', 'is_hospital',
+              'active', 'notes'],
+    'Species': ['name', 'common_name', 'num_allowed', 'date_approved', 'date_expires',
+                'protocol'],
+    'Locations': ['id', 'name', 'notes'],
+    'People': ['id', 'login_id', 'full_name', 'username', 'password', 'access', 'level',
+               'active', 'email', 'non_tufts_email', 'mobile_phone', 'notes'],
+    'Collections': ['id', 'date', 'by', 'name', 'street_address', 'town', 'water_body',
+                    'phone_number', 'url', 'latitude', 'longitude', 'sampling_gear',
+                    'seine_length', 'number_of_tries', 'water_temp', 'water_conductivity',
+                    'water_ph', 'water_flow_speed', 'is_commercial', 'notes'],
+    'Fish': ['id', 'tank', 'species', 'status', 'number_in_group', 'collection', 'notes'],
+    'Feeding': ['id', 'date', 'by', 'fish', 'fed', 'ate', 'notes'],
+    'Health': ['id', 'date', 'by', 'fish', 'event_type', 'change_status', 'from_tank',
+               'to_tank', 'treatment', 'death_status', 'notes'],
+    'WaterQuality': ['id', 'date', 'by', 'system', 'tank', 'conductivity', 'ph', 'ammonia',
+                     'nitrite', 'nitrate', 'water_change_pct', 'notes'],
+    'Maintenance': ['id', 'date', 'by', 'task', 'system', 'notes'],
+    'Groups': ['id', 'date', 'by', 'event_type', 'original_group', 'new_group',
+               'number_in_group', 'group_1', 'group_2', 'group_3', 'group_4', 'notes'],
+    'Experiments': ['id', 'date', 'by', 'fish', 'project', 'project_description',
+                    'experiment_description', 'is_terminal', 'n_fish', 'notes'],
+}
+
+# PostgREST writes booleans in CSV as t and f
+_csv_booleans = {'t': True, 'f': False, 'true': True, 'false': False,
+                 True: True, False: False}
+
+def _cast_columns(df, dtypes):
+    """Cast the columns of df that are in dtypes, leaving missing values empty"""
+    for col, dtype in dtypes.items():
+        if col not in df.columns or dtype == 'str':
+            continue
+        if dtype == 'boolean':
+            df[col] = df[col].map(_csv_booleans).astype('boolean')
+        elif dtype == 'Int64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+        elif dtype == 'float64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def csv_to_df(data, dtype=None, table=None, columns=None):
+    """Parse a PostgREST text/csv response straight into a typed DataFrame.
+
+    Skips building a list of dicts for every row, which is where most of the
+    time goes when reading large tables as JSON. If table is given, the
+    columns are cast to its types in table_schemas instead of the types
+    pandas would guess from the values.
+
+    An empty response has no header line, so the frame returned for it has
+    the columns given, or else all the columns of table"""
+
+    dtypes = {col: 'str' for col in csv_text_columns}
+    dtypes.update(table_schemas.get(table, {}))
+    if dtype:
+        dtypes.update(dtype)
+    text_columns = {col: 'str' for col, t in dtypes.items() if t == 'str'}
+
+    if not data or not data.strip():
+        if columns is None:
+            columns = table_columns.get(table, [])
+        df = pd.DataFrame({col: pd.Series(dtype=text_columns.get(col, object))
+                           for col in columns})
+    else:
+        df = pd.read_csv(io.StringIO(data), dtype=text_columns,
+                         true_values=['t', 'true'], false_values=['f', 'false'])
+    df = _cast_columns(df, dtypes)
+
+    for col in df.columns:
+        if col == 'date' or col.startswith('date_') or col.endswith('_at'):
+            df[col] = pd.to_datetime(df[col], format='ISO8601', errors='coerce')
+
+    return df
+
+def naive_dates(dates):
+    """Parse dates and convert any that have a time zone to naive UTC, so
+    dates from different tables can be compared and merged"""
+    dates = pd.to_datetime(dates, format='ISO8601', errors='coerce')
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert(None)
+    return dates
+
+@st.cache_resource
+def _in_flight():
+    """Reads that are running right now, shared by every session"""
+    return {'lock': threading.Lock(), 'calls': {}}
+
+def singleflight(func):
+    """Decorator for reads: if the same read, with the same arguments, is
+    already running for another session, wait for it and share its result
+    instead of sending another identical request. When everyone opens Check
+    Fish at the same time, the database sees one query instead of one per
+    session."""
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (func.__name__, tuple(bound.arguments.items()))
+
+        flights = _in_flight()
+        with flights['lock']:
+            call = flights['calls'].get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                flights['calls'][key] = call
+
+        if leader:
+            try:
+                call['result'] = func(*args, **kwargs)
+            except Exception as e:
+                call['error'] = e
+                raise
+            finally:
+                with flights['lock']:
+                    del flights['calls'][key]
+                call['done'].set()
+            result = call['result']
+        else:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            result = call['result']
+            logger.debug(f"Shared in-flight {func.__name__}")
+
+        # every caller gets its own copy
+        if isinstance(result, pd.DataFrame):
+            return result.copy()
+        return deepcopy(result)
+
+    return wrapper
+
 # Define status priority for ordering
 health_status_order = {
     'Sick': 1,
@@ -87,16 +268,25 @@ def get_all_table_names():
     return table_names
     
 # Fish database functions
+@shared('Fish')
+@singleflight
 def get_all_fish(include_dead = False,
                  only_groups = False,
                  include_system_details = True,
-                 return_df = False):
-    """Get all fish with their tank and system information"""
+                 return_df = False,
+                 as_csv = False):
+    """Get all fish with their tank and system information
+    
+    If as_csv is True, the rows are transferred as CSV and parsed directly
+    into a DataFrame (always returns a DataFrame)"""
 
     try:
         supabase = get_supabase_client()
 
-        if include_system_details:
+        if include_system_details and as_csv:
+            # spread the embedded tank columns so the CSV comes back flat
+            sel = '*, ...Tanks(system, shelf, position_in_shelf)'
+        elif include_system_details:
             sel = '*, Tanks(system, shelf, position_in_shelf)'
         else:
             sel = '*'
@@ -115,16 +305,23 @@ def get_all_fish(include_dead = False,
             # but this one is OK, so it doesn't matter
             query = query.gt('number_in_group', 1)
         
-        response = query.execute()
-        
-        fish_list = flatten_dict_list(response.data)
+        if as_csv:
+            response = query.csv().execute()
+            columns = table_columns['Fish'] if sel == '*' else \
+                table_columns['Fish'] + ['system', 'shelf', 'position_in_shelf']
+            fish_list = csv_to_df(response.data, table='Fish', columns=columns)
+        else:
+            response = query.execute()
+            fish_list = flatten_dict_list(response.data)
 
     except Exception as e:
         st.error(f"Database error in get_all_fish: {e}")
         fish_list = []
 
-    if return_df:
+    if return_df or as_csv:
         fish_list = pd.DataFrame(fish_list)
+        if fish_list.empty:
+            return fish_list
         # Add sort key based on status priority
         fish_list['sort_key'] = fish_list['status'].map(health_status_order).fillna(999)
         fish_list = fish_list.sort_values(['sort_key', 'id'])
@@ -169,6 +366,42 @@ def check_fish_in_same_tank():
         return dict()
 
 
+@shared('Feeding')
+@singleflight
+def _feeding_dates():
+    """Last fed and ate dates and refusals per fish, from the feeding_summary
+    function in migrations/0014_feeding_summary.sql"""
+
+    try:
+        supabase = get_supabase_client()
+        response = supabase.rpc('feeding_summary').execute()
+        feeding = pd.DataFrame(response.data or [],
+                               columns=['fish', 'last_fed', 'last_ate', 'refusals'])
+    except Exception as e:
+        st.error(f"Database error in get_feeding_summary: {e}")
+        feeding = pd.DataFrame(columns=['fish', 'last_fed', 'last_ate', 'refusals'])
+
+    feeding['last_fed'] = naive_dates(feeding['last_fed'])
+    feeding['last_ate'] = naive_dates(feeding['last_ate'])
+    feeding['refusals'] = feeding['refusals'].astype('Int64')
+    return feeding
+
+def get_feeding_summary():
+    """Get the last date each fish was fed and ate, and how many checks in a row
+    it has refused food. The grouping is done in the database, one row per
+    live fish that has been checked.
+
+    Returns a DataFrame indexed by fish id. The days since are worked out
+    here rather than kept in the cache, so they don't go stale"""
+
+    summary = _feeding_dates().set_index('fish')
+
+    now = pd.Timestamp.now()
+    summary['days_since_fed'] = (now - summary['last_fed']).dt.days
+    summary['days_since_ate'] = (now - summary['last_ate']).dt.days
+
+    return summary[['last_fed', 'last_ate', 'days_since_fed', 'days_since_ate', 'refusals']]
+
 def get_fish_health_notes(fish_id, days_back=14):
     """Get health notes for a specific fish from the last N days"""
     try:
@@ -193,6 +426,221 @@ def get_fish_health_notes(fish_id, days_back=14):
         st.error(f"Error fetching health notes: {str(e)}")
         return pd.DataFrame()
 
+def search_notes(search, fish_id=None, system=None, start=None, end=None,
+                 max_results=50):
+    """Search the notes in Health, Feeding, Maintenance, WaterQuality,
+    Collections and Experiments, best matches first.
+
+    Uses the search_notes function and full text indexes from
+    migrations/0004_search_notes.sql. search takes web search syntax, e.g. 'fin rot',
+    '"fin rot"', 'ich or velvet'"""
+    try:
+        supabase = get_supabase_client()
+        response = supabase.rpc('search_notes', {
+            'search': search,
+            'fish_id': fish_id,
+            'system_name': system,
+            'date_from': start.isoformat() if start is not None else None,
+            'date_to': end.isoformat() if end is not None else None,
+            'max_results': max_results
+        }).execute()
+
+        results = pd.DataFrame(response.data)
+        if not results.empty:
+            results['date'] = pd.to_datetime(results['date'], format='ISO8601')
+        return results
+    except Exception as e:
+        st.error(f"Database error in search_notes: {e}")
+        return pd.DataFrame()
+
+dashboard_sections = ['status_counts', 'needs_attention', 'water_overdue',
+                      'unchecked_today', 'open_treatments', 'permits_expiring']
+
+@st.cache_data(ttl=dashboard_cache_ttl, show_spinner=False)
+def _dashboard_summary(today):
+    # errors are raised rather than returned, so that they aren't cached
+    supabase = get_supabase_client()
+    response = supabase.rpc('dashboard_summary', {
+        'today': today.isoformat(),
+        'water_check_days': water_check_days,
+        'permit_warning_days': permit_warning_days
+    }).execute()
+    return response.data or {}
+
+def get_dashboard_summary(today):
+    """Everything the home page dashboard shows, from one call to the
+    dashboard_summary function in migrations/0006_dashboard_summary.sql.
+
+    Returns a dict with a DataFrame for each of dashboard_sections. today is
+    passed in (rather than read here) so that it is part of the cache key, and
+    the counts start over at midnight"""
+
+    try:
+        summary = _dashboard_summary(today)
+    except Exception as e:
+        st.error(f"Database error in get_dashboard_summary: {e}")
+        summary = {}
+
+    return {section: pd.DataFrame(summary.get(section) or [])
+            for section in dashboard_sections}
+
+# Health event types that start and end a treatment
+treatment_start_events = ['Start Treatment', 'Treatment Start']
+treatment_end_events = ['End Treatment', 'Treatment End']
+
+# fish_summary columns that a trigger on Fish keeps in step with the Fish
+# table (migrations/0013_fish_summary_sync.sql)
+_fish_summary_synced = ['species', 'tank', 'status', 'number_in_group']
+
+def _update_fish_summary(supabase, rows):
+    """Update the history columns (last check, last health event, treatment)
+    of one or more fish_summary rows. Only existing rows are updated; the
+    trigger on Fish adds the row for each new fish and keeps its species,
+    tank, status and number_in_group up to date, so those are left out.
+
+    A failure here is shown as a warning but not raised, because the write
+    that caused it has already happened; rebuild_fish_summary will fix up
+    the table"""
+
+    if isinstance(rows, dict):
+        rows = [rows]
+    try:
+        for row in rows:
+            fields = {k: v for k, v in row.items()
+                      if k != 'fish' and k not in _fish_summary_synced}
+            if fields:
+                supabase.table('fish_summary').update(fields).eq('fish', row['fish']).execute()
+    except Exception as e:
+        logger.warning(f"Could not update fish_summary: {e}")
+        st.warning(f"Saved, but the fish summary could not be updated ({e}). "
+                   "Use \"Rebuild fish summary\" on the Tables page to fix it.")
+    invalidate('fish_summary')
+
+def _health_summary(date_time_str, event_type, treatment=None):
+    """The fish_summary columns that change with a health event"""
+
+    fields = {'last_health_date': date_time_str,
+              'last_health_event': event_type}
+    if event_type in treatment_start_events:
+        fields.update({'active_treatment': treatment or 'Treatment',
+                       'treatment_start': date_time_str})
+    elif event_type in treatment_end_events:
+        fields.update({'active_treatment': None,
+                       'treatment_start': None})
+    return fields
+
+def _latest_per_fish(latest, page):
+    """Keep only the latest row for each fish, one page at a time"""
+    both = pd.concat([latest, page], ignore_index=True) if latest is not None else page
+    return both.sort_values('date').drop_duplicates('fish', keep='last')
+
+def rebuild_fish_summary():
+    """Rebuild the whole fish_summary table from the Fish, Feeding and Health
+    tables. The history is read a page at a time, keeping only the latest rows"""
+
+    try:
+        supabase = get_supabase_client()
+
+        fish = get_all_fish(include_dead=True, include_system_details=False, as_csv=True)
+        if fish.empty:
+            return 0
+
+        last_check = None
+        for page in iter_table_pages('Feeding', columns='fish, date, fed, ate'):
+            last_check = _latest_per_fish(last_check, page)
+
+        last_health = None
+        last_treatment = None
+        for page in iter_table_pages('Health', columns='fish, date, event_type, treatment'):
+            last_health = _latest_per_fish(last_health, page)
+            is_treatment = page['event_type'].isin(treatment_start_events + treatment_end_events)
+            last_treatment = _latest_per_fish(last_treatment, page[is_treatment])
+
+        summary = pd.DataFrame({
+            'fish': fish['id'],
+            'species': fish['species'],
+            'tank': fish['tank'],
+            'status': fish['status'],
+            'number_in_group': fish['number_in_group'],
+        }).set_index('fish')
+
+        if last_check is not None:
+            last_check = last_check.set_index('fish')
+            summary['last_check'] = last_check['date']
+            summary['last_fed'] = last_check['fed']
+            summary['last_ate'] = last_check['ate']
+        if last_health is not None:
+            last_health = last_health.set_index('fish')
+            summary['last_health_date'] = last_health['date']
+            summary['last_health_event'] = last_health['event_type']
+        if last_treatment is not None:
+            active = last_treatment[last_treatment['event_type'].isin(treatment_start_events)]
+            active = active.set_index('fish')
+            summary['active_treatment'] = active['treatment'].fillna('Treatment')
+            summary['treatment_start'] = active['date']
+
+        summary['number_in_group'] = summary['number_in_group'].astype('Int64')
+        for col in ['last_check', 'last_health_date', 'treatment_start']:
+            if col in summary.columns:
+                summary[col] = summary[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+        summary = summary.reset_index()
+        summary = summary.astype(object).where(summary.notna(), None)
+        rows = summary.to_dict('records')
+
+        for start in range(0, len(rows), 500):
+            supabase.table('fish_summary').upsert(rows[start:start + 500],
+                                                  on_conflict='fish').execute()
+        invalidate('fish_summary')
+
+        return len(rows)
+
+    except Exception as e:
+        st.error(f"Database error in rebuild_fish_summary: {e}")
+        return 0
+
+@shared('fish_summary')
+@singleflight
+def get_fish_summary(include_dead = False,
+                     return_df = False):
+    """Get the current state of each fish from the fish_summary table:
+    tank and location, status, group size, last check, last health event and
+    active treatment. Same id and location columns as get_all_fish.
+
+    The table is filled in by migrations/0009_fill_fish_summary.sql, or by
+    rebuild_fish_summary (the "Rebuild fish summary" button on the Tables page).
+    A trigger on Fish (0013_fish_summary_sync.sql) keeps the Fish columns in step"""
+
+    try:
+        supabase = get_supabase_client()
+
+        query = (
+            supabase.table('fish_summary')
+            .select('id:fish, *, ...Tanks(system, shelf, position_in_shelf)')
+        )
+        if not include_dead:
+            # rows added by a partial update can have no status yet, and
+            # neq alone would leave them out
+            query = query.or_('status.is.null,status.neq.Dead')
+        response = query.execute()
+
+        summary = response.data
+
+    except Exception as e:
+        st.error(f"Database error in get_fish_summary: {e}")
+        summary = []
+
+    if return_df:
+        summary = pd.DataFrame(summary)
+        if summary.empty:
+            return summary
+        summary['sort_key'] = summary['status'].map(health_status_order).fillna(999)
+        summary = summary.sort_values(['sort_key', 'id'])
+
+    return summary
+
+@shared('Tanks')
+@singleflight
 def get_all_tanks(return_df = False,
                   include_system_details = False,
                   only_active = False):
@@ -266,7 +714,12 @@ def get_tanks_without_fish(return_df = False):
     return ret
 
 def get_all_from_table(table_name, order_by=None,
-                       return_df = False):
+                       return_df = False,
+                       as_csv = False):
+    """Get every row in a table.
+
+    If as_csv is True, the rows are transferred as CSV and parsed directly
+    into a DataFrame (always returns a DataFrame)"""
     try:
         supabase = get_supabase_client()
 
@@ -277,6 +730,10 @@ def get_all_from_table(table_name, order_by=None,
         if order_by:
             response = response.order(order_by)
         
+        if as_csv:
+            ret = response.csv().execute()
+            return csv_to_df(ret.data, table=table_name)
+
         ret = response.execute()
         ret = ret.data
         
@@ -284,10 +741,98 @@ def get_all_from_table(table_name, order_by=None,
         st.error(f"Database error in get_all_from_table: {e}")
         ret = []
 
-    if return_df:
+    if return_df or as_csv:
         ret = pd.DataFrame(ret)
     return ret    
 
+# Column used to give each table a stable order when reading it in pages
+table_order_columns = {
+    'Locations': 'name',
+    'People': 'full_name',
+    'Species': 'name',
+    'Systems': 'name',
+    'Tanks': 'name',
+}
+
+def get_latest_id(table_name):
+    """Id of the most recent row in a table, 0 if it is empty or None if it
+    can't be read. Used to tell if an index built from the table has to be
+    rebuilt"""
+
+    try:
+        supabase = get_supabase_client()
+        response = (
+            supabase.table(table_name)
+            .select('id')
+            .order('id', desc=True)
+            .limit(1)
+            .execute()
+        )
+        return response.data[0]['id'] if response.data else 0
+    except Exception as e:
+        logger.warning(f"Could not get latest {table_name} id: {e}")
+        return None
+
+def apply_filters(query, filters=None):
+    """Apply a list of (operator, column, value) filters to a query,
+    e.g. [('in_', 'fish', ['A1', 'A2']), ('gte', 'date', '2024-01-01')]"""
+    for op, column, value in filters or []:
+        query = getattr(query, op)(column, value)
+    return query
+
+def iter_table_pages(table_name, filters=None, order_by=None, desc=False,
+                     page_size=1000, columns='*', as_text=False, supabase=None):
+    """Read a table one page at a time, yielding a DataFrame for each page
+    (or the raw CSV text, with its header line, if as_text is True).
+
+    Pages are transferred as CSV and only one page is held in memory at a time,
+    so this is safe to use on very long tables like Feeding. Scripts that run
+    outside of Streamlit can pass in their own supabase client.
+
+    order_by can be a list of columns. The order has to be unique (end with a
+    key like id), or rows can be skipped or repeated from one page to the next"""
+    if supabase is None:
+        supabase = get_supabase_client()
+
+    if order_by is None:
+        order_by = table_order_columns.get(table_name, 'id')
+
+    start = 0
+    while True:
+        query = supabase.table(table_name).select(columns)
+        query = apply_filters(query, filters)
+        for column in ([order_by] if isinstance(order_by, str) else order_by):
+            query = query.order(column, desc=desc)
+        response = (
+            query
+            .range(start, start + page_size - 1)
+            .csv()
+            .execute()
+        )
+
+        if not response.data:
+            break
+
+        # the header line is always there, so an empty page has a single line.
+        # Notes with line breaks make this overcount, which only costs one
+        # extra (empty) request at the end
+        nrows = response.data.count('\n')
+        if not response.data.endswith('\n'):
+            nrows += 1
+        nrows -= 1
+        if nrows <= 0:
+            break
+
+        if as_text:
+            yield response.data
+        else:
+            yield csv_to_df(response.data, table=table_name)
+
+        if nrows < page_size:
+            break
+        start += page_size
+
+@shared('Systems')
 def get_all_systems(return_df = False):
     """Get all available systems"""
 
@@ -307,12 +852,14 @@ def get_all_systems(return_df = False):
     else:
         return systems
     
+@shared('People')
 def get_all_people(return_df = False):
     """Get list of names from People table"""
 
     return get_all_from_table('People', order_by='full_name',
                               return_df=return_df)
 
+@shared('Species')
 def get_all_species(return_df = False):
     """Get all available species"""
 
@@ -348,6 +895,7 @@ def add_tanks(new_tanks_df):
             response = supabase.table('Tanks').insert(insert_data).execute()
             if response.data:
                 changes_made = True
+                invalidate('Tanks')
         except Exception as e:
             errors.append(f"Error inserting new row (name = {row['name']}): {str(e)}")
     
@@ -391,6 +939,8 @@ def update_tanks(updated_tanks_df):
                     )
                     if response.data:
                         changes_made = True
+                        # the fish summary has each tank's system and shelf
+                        invalidate('Tanks', 'fish_summary')
                 except Exception as e:
                     errors.append(f"Error updating row {row_id}: {str(e)}")
 
@@ -416,19 +966,120 @@ def add_tank(tank_name, tank_vol, is_hospital, system, shelf=None):
             })
             .execute()
         )
+        invalidate('Tanks')
         return True
 
     except Exception as e:
         st.error(f"Database error in add_tank: {e}")
         return False
 
+def _species_headcount():
+    """Read the species_headcount table, which triggers on Fish and
+    Experiments keep up to date (migrations/0012_species_headcount.sql)"""
+
+    supabase = get_supabase_client()
+    response = supabase.table('species_headcount').select('species, alive, used').execute()
+    return {row['species']: {'alive': row['alive'], 'used': row['used']}
+            for row in response.data}
+
+@shared('species_headcount')
+def get_species_headcount():
+    """Get the number of live and used animals of each species, as a dict of
+    species to {'alive': n, 'used': n}"""
+
+    return _species_headcount()
+
+def _permit_status(headcount):
+    status = []
+    for s1 in get_all_species():
+        counts = headcount.get(s1['name'], {'alive': 0, 'used': 0})
+        allowed = s1.get('num_allowed')
+        total = counts['alive'] + counts['used']
+        status.append({
+            'species': s1['name'],
+            'alive': counts['alive'],
+            'used': counts['used'],
+            'total': total,
+            'allowed': allowed,
+            'remaining': allowed - total if allowed is not None else None,
+            'date_approved': s1.get('date_approved'),
+            'date_expires': s1.get('date_expires')
+        })
+    return status
+
+def get_permit_status(return_df = False):
+    """Compare the animals alive and used for each species with the number
+    allowed by its permit"""
+
+    try:
+        status = _permit_status(get_species_headcount())
+    except Exception as e:
+        st.error(f"Database error in get_permit_status: {e}")
+        status = []
+
+    if return_df:
+        return pd.DataFrame(status)
+    return status
+
+def _get_fish_headcount(supabase, fish_id):
+    """Get the species, number of animals and whether a fish is alive"""
+
+    response = (
+        supabase.table("Fish")
+        .select('species, number_in_group, status')
+        .eq('id', fish_id)
+        .execute()
+    )
+    if not response.data:
+        return None, 0, False
+
+    fish = response.data[0]
+    number = fish['number_in_group'] if fish['number_in_group'] is not None else 1
+    return fish['species'], number, fish['status'] != 'Dead'
+
+def check_permits(new_by_species):
+    """Check that adding animals stays within each species' permit.
+    new_by_species is a dict of species to the number of new animals.
+    Returns a list of errors, which is empty if everything is OK"""
+
+    errors = []
+    if not any(n > 0 for n in new_by_species.values()):
+        return errors
+
+    # read the counts rather than the cached copy, so that adds made a
+    # moment ago in another session are counted
+    try:
+        permits = {p1['species']: p1 for p1 in _permit_status(_species_headcount())}
+    except Exception as e:
+        return [f"Could not check the permits: {e}"]
+
+    today = datetime.now().date().isoformat()
+    for species, n in new_by_species.items():
+        if n <= 0:
+            continue
+        permit = permits.get(species)
+        if permit is None:
+            errors.append(f"Species {species} is not in the Species table")
+            continue
+        if permit['date_expires'] and str(permit['date_expires'])[:10] < today:
+            errors.append(f"The permit for {species} expired on {str(permit['date_expires'])[:10]}")
+        if permit['allowed'] is not None and permit['total'] + n > permit['allowed']:
+            errors.append(f"Adding {n} {species} would make {permit['total'] + n}, "
+                          f"but the permit allows {permit['allowed']}")
+
+    return errors
+
 def add_fish(new_fish_df):
     """Add several new fish, stored in a Pandas dataframe"""
 
     supabase = get_supabase_client()
 
+    numbers = new_fish_df['number_in_group'].fillna(1).astype(int)
+    errors = check_permits(numbers.groupby(new_fish_df['species']).sum().to_dict())
+    if errors:
+        return False, errors
+
     changes_made = False
-    errors = []
     for idx, row in new_fish_df.iterrows():
         try:
             insert_data = row.to_dict()
@@ -440,7 +1091,9 @@ def add_fish(new_fish_df):
                 changes_made = True
         except Exception as e:
             errors.append(f"Error inserting new row (name = {row['id']}): {str(e)}")
-    
+
+    if changes_made:
+        invalidate('Fish', 'fish_summary', 'species_headcount')
     return changes_made, errors
 
 def add_collection(date_time, person, name, latitude=None, longitude=None, 
@@ -487,21 +1140,38 @@ def add_collection(date_time, person, name, latitude=None, longitude=None,
 
 def log_maintenance(date_time, person, task, system, notes):
     """Log a maintenance task to the database"""
+    return log_maintenance_bulk(date_time, person, [(task, system, notes)])
+
+def log_maintenance_bulk(date_time, person, entries):
+    """Log several maintenance tasks at once, as a list of (task, system,
+    notes). system can also be a list of systems, for a task that was done
+    for each of them. All the rows are inserted in one request, so either
+    all of them are logged or none are"""
     try:
         supabase = get_supabase_client()
 
         date_time_str = date_time.strftime('%Y-%m-%d %H:%M:%S')
-        if system == "":
-            system = None
+        rows = []
+        for task, systems, notes in entries:
+            if not isinstance(systems, (list, tuple, set)):
+                systems = [systems]
+            if not systems:
+                systems = [None]
+            for system in systems:
+                rows.append({
+                    'date': date_time_str,
+                    'by': person,
+                    'task': task,
+                    'system': system if system != "" else None,
+                    'notes': notes
+                })
+
+        if not rows:
+            return True
+
         response = (
             supabase.table("Maintenance")
-            .insert({
-                'date': date_time_str,
-                'by': person,
-                'task': task,
-                'system': system,
-                'notes': notes
-            })
+            .insert(rows)
             .execute()
         )
 
@@ -533,6 +1203,25 @@ def get_maintenance_logs(days_back=14):
         st.error(f"Error fetching maintenance logs: {str(e)}")
         return pd.DataFrame()
         
+def get_latest_maintenance(tasks=None):
+    """Get the most recent Maintenance row for each task and system, from the
+    maintenance_latest view (migrations/0007_maintenance_latest.sql)"""
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table('maintenance_latest').select('*')
+        if tasks is not None:
+            query = query.in_('task', list(tasks))
+        response = query.execute()
+
+        latest = pd.DataFrame(response.data, columns=['task', 'system', 'date', 'by', 'notes'])
+        latest['date'] = pd.to_datetime(latest['date'], format='ISO8601')
+        return latest
+    except Exception as e:
+        st.error(f"Database error in get_latest_maintenance: {e}")
+        latest = pd.DataFrame(columns=['task', 'system', 'date', 'by', 'notes'])
+        latest['date'] = pd.to_datetime(latest['date'])
+        return latest
+
 def log_water(date_time, person, system, conductivity, pH, ammonia, nitrate, nitrite, waterx, notes, tank=None):
     """Log a water quality check to the database"""
     try:
@@ -582,6 +1271,12 @@ def log_check(date_time, person, fish_id, fed, ate, notes):
             })
             .execute()
         )
+
+        invalidate('Feeding')
+        _update_fish_summary(supabase, {'fish': fish_id,
+                                        'last_check': date_time_str,
+                                        'last_fed': fed,
+                                        'last_ate': ate})
         return True
 
     except Exception as e:
@@ -600,6 +1295,12 @@ def log_health_event(date_time, person, fish_id, event_type, notes,
 
         date_time_str = date_time.strftime('%Y-%m-%d %H:%M:%S')
 
+        if death_status is not None and from_tank is None:
+            # the fish's tank is cleared below, so keep where it died with the event
+            response = supabase.table("Fish").select('tank').eq('id', fish_id).execute()
+            if response.data:
+                from_tank = response.data[0]['tank']
+
         response = (
             supabase.table("Health")
             .insert({
@@ -628,11 +1329,17 @@ def log_health_event(date_time, person, fish_id, event_type, notes,
         if upd:
             response = (
                 supabase.table("Fish")
-                .update({'status': new_status})
+                .update(upd)
                 .eq('id', fish_id)
                 .execute()
             )
 
+        summary = _health_summary(date_time_str, event_type, treatment)
+        summary.update(upd)
+        summary['fish'] = fish_id
+        invalidate('Fish', 'fish_summary')
+        _update_fish_summary(supabase, summary)
+
         return True
 
     except Exception as e:
@@ -666,6 +1373,11 @@ def log_new_health_status(date_time, person, fish_id, status, notes):
             .eq('id', fish_id)
             .execute()
         )
+
+        summary = _health_summary(date_time_str, 'Change Status')
+        summary.update({'fish': fish_id, 'status': status})
+        invalidate('Fish', 'fish_summary')
+        _update_fish_summary(supabase, summary)
         return True
 
     except Exception as e:
@@ -704,6 +1416,8 @@ def log_number_in_group(date_time, person, fish_id, num, notes,
             .eq('id', fish_id)
             .execute()
         )
+
+        invalidate('Fish', 'fish_summary')
         return True
 
     except Exception as e:
@@ -721,6 +1435,13 @@ def split_group(group_id, new_group_df, person, date_time, notes=None):
         new_group_df['number_in_group'] = new_group_df['number_in_group'].fillna(1).astype(int)
         new_group_df['collection'] = new_group_df['collection'].astype(int)
 
+        # the new groups should add up to the original, but check in case they don't
+        species, original_number, is_alive = _get_fish_headcount(supabase, group_id)
+        added = int(new_group_df['number_in_group'].sum()) - original_number
+        errors = check_permits({species: added})
+        if errors:
+            return False, errors
+
         for idx, row in new_group_df.iterrows():
             if row['id'] == group_id:
                 response = (
@@ -748,6 +1469,8 @@ def split_group(group_id, new_group_df, person, date_time, notes=None):
         for i, new_id in enumerate(new_group_ids):
             insert_data[f'group_{i+1}'] = new_id
 
+        invalidate('Fish', 'fish_summary')
+
         response = supabase.table('Groups').insert(insert_data).execute()
         if not response.data:
             errors.append(f"Failed to split group {group_id} into groups {', '.join(new_group_ids)}")
@@ -787,6 +1510,8 @@ def merge_groups(original_group_ids, new_group_id, number_in_group, person, date
             .execute()
         )
 
+        invalidate('Fish', 'fish_summary')
+
         insert_data = {
             'date': date_time_str,
             'by': person,
@@ -882,12 +1607,56 @@ def move_fish_to_tank(date_time, person, fish_id, to_tank, notes,
             .eq('id', fish_id)
             .execute()
         )
+
+        summary = _health_summary(date_time_str, 'Tank Move')
+        summary.update(upd)
+        summary['fish'] = fish_id
+        invalidate('Fish', 'fish_summary')
+        _update_fish_summary(supabase, summary)
         return True
 
     except Exception as e:
         st.error(f"Database error: {e}")
         return False
 
+def apply_fish_changes(date_time, person, changes, notes=None):
+    """Move and/or change the status of many fish at once, through the
+    apply_fish_changes function in migrations/0015_bulk_fish_changes_more_checks.sql.
+
+    changes is a DataFrame with fish, to_tank and new_status columns (None to
+    leave one as it is), and the from_tank and status each fish had when the
+    changes were made. If any fish no longer has them, a new tank has
+    filled up since, fish from more than one tank would go to the same tank,
+    or a fish would be marked Dead, nothing is written. Everything is written
+    in one transaction.
+
+    Returns a DataFrame of the fish changed, with their old_tank and
+    old_status and their new tank and status, or None on an error"""
+
+    try:
+        supabase = get_supabase_client()
+
+        date_time_str = date_time.strftime('%Y-%m-%d %H:%M:%S')
+        rows = changes[['fish', 'to_tank', 'new_status', 'from_tank', 'status']]
+        rows = (rows.rename(columns={'from_tank': 'expected_tank', 'status': 'expected_status'})
+                .astype(object).where(rows.notna().values, None)
+                .to_dict(orient='records'))
+
+        response = supabase.rpc('apply_fish_changes', {
+            'changes': rows,
+            'event_date': date_time_str,
+            'person': person,
+            'notes': notes
+        }).execute()
+
+    except Exception as e:
+        st.error(f"Database error in apply_fish_changes: {e}")
+        return None
+
+    invalidate('Fish', 'fish_summary')
+    return pd.DataFrame(response.data or [],
+                        columns=['fish', 'old_tank', 'old_status', 'tank', 'status'])
+
 def record_experiment(fish_id, project, project_description, experiment_description,
                       date, person, is_terminal, n_fish=1):
     """Record a new experiment"""
@@ -933,6 +1702,7 @@ def record_experiment(fish_id, project, project_description, experiment_descript
                     .eq('id', fish_id)
                     .execute()
                 )
+                invalidate('Fish', 'fish_summary')
             else:
                 response = (
                     supabase.table("Fish")
@@ -942,6 +1712,7 @@ def record_experiment(fish_id, project, project_description, experiment_descript
                     .eq('id', fish_id)
                     .execute()
                 )
+                invalidate('Fish', 'fish_summary')
 
         return True
     except Exception as e:
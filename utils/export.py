@@ -0,0 +1,92 @@
+import gzip
+import shutil
+import tempfile
+import zipfile
+import logging
+import pandas as pd
+
+import utils.dbfunctions as db
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# keep exports in memory up to this size, then spill to a temporary file
+max_export_memory = 32 * 1024 * 1024
+
+export_formats = {
+    "CSV (gzip)": 'csv.gz',
+    "Parquet": 'parquet'
+}
+
+def _write_csv_gz(zf, table_name, filters, page_size):
+    """Stream the pages of one table into a gzipped CSV inside the zip file"""
+
+    with zf.open(f"{table_name}.csv.gz", 'w') as member:
+        with gzip.GzipFile(fileobj=member, mode='wb') as gz:
+            for i, page in enumerate(db.iter_table_pages(table_name, filters=filters,
+                                                        page_size=page_size,
+                                                        as_text=True)):
+                if i > 0:
+                    # drop the header line on every page after the first one
+                    page = page.split('\n', 1)[1] if '\n' in page else ''
+                if not page:
+                    continue
+                if not page.endswith('\n'):
+                    page += '\n'
+                gz.write(page.encode('utf-8'))
+
+def _write_parquet(zf, table_name, filters, page_size):
+    """Stream the pages of one table into a Parquet file inside the zip file"""
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    typed_columns = db.table_schemas.get(table_name, {})
+
+    writer = None
+    with tempfile.SpooledTemporaryFile(max_size=max_export_memory) as buf:
+        for page in db.iter_table_pages(table_name, filters=filters,
+                                        page_size=page_size):
+            # iter_table_pages casts the columns in db.table_schemas; everything
+            # else except the dates is text, so that no column's type depends
+            # on what is on the page
+            for col in page.columns:
+                if col not in typed_columns and not pd.api.types.is_datetime64_any_dtype(page[col]):
+                    page[col] = page[col].astype('str')
+            arrow_page = pa.Table.from_pandas(page, preserve_index=False)
+            if writer is None:
+                # columns that are empty on the first page would otherwise have
+                # null type and refuse any values on the later pages
+                arrow_schema = pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f
+                                          for f in arrow_page.schema])
+                writer = pq.ParquetWriter(buf, arrow_schema)
+            writer.write_table(arrow_page.cast(writer.schema))
+
+        if writer is None:
+            return
+        writer.close()
+
+        buf.seek(0)
+        with zf.open(f"{table_name}.parquet", 'w') as member:
+            shutil.copyfileobj(buf, member)
+
+def build_export(tables, fmt='csv.gz', page_size=1000):
+    """Build a zip file with one compressed file per table.
+
+    tables is a dict of table name to a list of filters (see db.apply_filters),
+    or None for the whole table. Each table is read page by page, so only one
+    page is held in memory at a time while the zip file is built. Returns the
+    bytes of the zip file, which is what st.download_button takes."""
+
+    with tempfile.SpooledTemporaryFile(max_size=max_export_memory) as out:
+        # the members are already compressed, so don't compress them again
+        with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED) as zf:
+            for table_name, filters in tables.items():
+                if fmt == 'parquet':
+                    _write_parquet(zf, table_name, filters, page_size)
+                else:
+                    _write_csv_gz(zf, table_name, filters, page_size)
+                logger.debug(f"Exported {table_name}")
+
+        out.seek(0)
+        return out.read()
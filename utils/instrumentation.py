@@ -0,0 +1,33 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+
+import utils.warmup as warmup
+from utils.cache import cache_stats, cache_backend_name
+
+def show_instrumentation():
+    """Sidebar panel with the server warm-up progress and the shared cache"""
+
+    with st.sidebar.expander("⏱️ Instrumentation", expanded=False):
+        status = warmup.get_warmup_status()
+        done = len(status['steps'])
+
+        st.markdown("**Warm-up**")
+        if status['started'] is None:
+            st.caption("Not started")
+        else:
+            started = datetime.fromtimestamp(status['started']).strftime('%Y-%m-%d %H:%M:%S')
+            if status['finished'] is None:
+                st.progress(done / status['total'], text=f"Started {started}: {done} of {status['total']} steps")
+            else:
+                st.caption(f"Started {started}, took {status['finished'] - status['started']:.1f} s")
+            if status['steps']:
+                st.dataframe(pd.DataFrame(status['steps']), hide_index=True, width='stretch')
+
+        entries, hits, misses = cache_stats()
+        st.markdown(f"**Shared cache** ({cache_backend_name()})")
+        total = hits + misses
+        st.caption(f"{len(entries)} entries, {hits} hits, {misses} misses"
+                   + (f" ({100 * hits / total:.0f}% hit rate)" if total else ""))
+        if not entries.empty:
+            st.dataframe(entries, hide_index=True, width='stretch')
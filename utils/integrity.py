@@ -0,0 +1,154 @@
+import pandas as pd
+import logging
+
+import utils.dbfunctions as db
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# columns read from each table. Each table is read once for all the rules
+integrity_tables = {
+    'Fish': 'id, tank, status, number_in_group',
+    'Tanks': 'name, system, is_hospital, active',
+    'Systems': 'name',
+    'Health': 'id, fish, date, from_tank, to_tank'
+}
+
+violation_columns = ['rule', 'table', 'key', 'problem', 'fix']
+
+def load_tables(supabase=None):
+    """Read each table needed by the integrity rules once. Only Tank Move rows
+    are read from the Health table"""
+
+    filters = {'Health': [('eq', 'event_type', 'Tank Move')]}
+    tables = {}
+    for table_name, columns in integrity_tables.items():
+        pages = [p for p in db.iter_table_pages(table_name, columns=columns,
+                                                filters=filters.get(table_name),
+                                                supabase=supabase)
+                 if not p.empty]
+        if pages:
+            tables[table_name] = pd.concat(pages, ignore_index=True)
+        else:
+            tables[table_name] = pd.DataFrame(columns=[c.strip() for c in columns.split(',')])
+    return tables
+
+def _violations(rule, table, rows, key, problem, fix):
+    """Build the violation rows for one rule. key, problem and fix are
+    Series (or strings) lined up with rows"""
+    if rows.empty:
+        return pd.DataFrame(columns=violation_columns)
+    return pd.DataFrame({'rule': rule, 'table': table,
+                         'key': key, 'problem': problem, 'fix': fix},
+                        index=rows.index)[violation_columns]
+
+def _alive(fish):
+    return fish[fish['status'] != 'Dead']
+
+def dead_fish_in_tank(tables):
+    fish = tables['Fish']
+    rows = fish[(fish['status'] == 'Dead') & fish['tank'].notna()]
+    return _violations('dead_fish_in_tank', 'Fish', rows, rows['id'],
+                       'Dead but still in tank ' + rows['tank'].astype(str),
+                       'Clear the tank for this fish so ' + rows['tank'].astype(str) + ' can be reused')
+
+def empty_group_alive(tables):
+    fish = _alive(tables['Fish'])
+    rows = fish[pd.to_numeric(fish['number_in_group'], errors='coerce') == 0]
+    return _violations('empty_group_alive', 'Fish', rows, rows['id'],
+                       'Group has no fish left but status is ' + rows['status'].astype(str),
+                       'Recount the group, or mark it Dead if it is really empty')
+
+def fish_in_inactive_tank(tables):
+    fish = _alive(tables['Fish'])
+    tanks = tables['Tanks']
+    inactive = tanks.loc[tanks['active'].astype(str).str.lower() == 'false', 'name']
+    rows = fish[fish['tank'].isin(inactive)]
+    return _violations('fish_in_inactive_tank', 'Fish', rows, rows['id'],
+                       'In tank ' + rows['tank'].astype(str) + ', which is marked inactive',
+                       'Mark tank ' + rows['tank'].astype(str) + ' active, or move the fish')
+
+def fish_in_unknown_tank(tables):
+    fish = _alive(tables['Fish'])
+    rows = fish[fish['tank'].notna() & ~fish['tank'].isin(tables['Tanks']['name'])]
+    return _violations('fish_in_unknown_tank', 'Fish', rows, rows['id'],
+                       'In tank ' + rows['tank'].astype(str) + ', which is not in the Tanks table',
+                       'Add tank ' + rows['tank'].astype(str) + ' on Organize Tanks, or move the fish')
+
+def fish_sharing_tank(tables):
+    fish = _alive(tables['Fish'])
+    fish = fish[fish['tank'].notna()]
+    rows = fish[fish.duplicated('tank', keep=False)]
+    others = rows.groupby('tank')['id'].transform(lambda ids: ', '.join(ids.astype(str))).astype(str)
+    return _violations('fish_sharing_tank', 'Fish', rows, rows['id'],
+                       'Shares tank ' + rows['tank'].astype(str) + ' (' + others + ')',
+                       'Move all but one of the fish to another tank, or merge them into a group')
+
+def tank_without_system(tables):
+    tanks = tables['Tanks']
+    is_hospital = tanks['is_hospital'].astype(str).str.lower() == 'true'
+    rows = tanks[tanks['system'].isna() & ~is_hospital]
+    return _violations('tank_without_system', 'Tanks', rows, rows['name'],
+                       'Not in a system and not marked as a hospital tank',
+                       'Set the system, or check Hospital, on Organize Tanks')
+
+def tank_in_unknown_system(tables):
+    tanks = tables['Tanks']
+    rows = tanks[tanks['system'].notna() & ~tanks['system'].isin(tables['Systems']['name'])]
+    return _violations('tank_in_unknown_system', 'Tanks', rows, rows['name'],
+                       'In system ' + rows['system'].astype(str) + ', which is not in the Systems table',
+                       'Add system ' + rows['system'].astype(str) + ', or change the tank\'s system')
+
+def broken_move_chain(tables):
+    moves = tables['Health'].sort_values(['fish', 'date', 'id'])
+    previous = moves.groupby('fish')['to_tank'].shift()
+    rows = moves[previous.notna() & (moves['from_tank'] != previous)]
+    previous = previous[rows.index]
+    return _violations('broken_move_chain', 'Health', rows, rows['id'].astype(str),
+                       rows['fish'].astype(str) + ' moved from ' + rows['from_tank'].astype(str) +
+                       ' on ' + rows['date'].astype(str).str[:10] +
+                       ', but its previous move was to ' + previous.astype(str),
+                       'Log the missing move, or correct from_tank to ' + previous.astype(str))
+
+def tank_differs_from_last_move(tables):
+    moves = tables['Health'].sort_values(['fish', 'date', 'id'])
+    last_move = moves.drop_duplicates('fish', keep='last').set_index('fish')['to_tank']
+    fish = _alive(tables['Fish'])
+    expected = fish['id'].map(last_move)
+    rows = fish[expected.notna() & (fish['tank'] != expected)]
+    expected = expected[rows.index]
+    return _violations('tank_differs_from_last_move', 'Fish', rows, rows['id'],
+                       'In tank ' + rows['tank'].astype(str) +
+                       ', but its last move was to ' + expected.astype(str),
+                       'Log a Tank Move to ' + rows['tank'].astype(str) + ', or move it back to ' +
+                       expected.astype(str))
+
+# every rule, with a short description for the report
+integrity_rules = {
+    'dead_fish_in_tank': (dead_fish_in_tank, "Dead fish still holding a tank"),
+    'empty_group_alive': (empty_group_alive, "Groups with no fish that are not marked dead"),
+    'fish_in_inactive_tank': (fish_in_inactive_tank, "Live fish in inactive tanks"),
+    'fish_in_unknown_tank': (fish_in_unknown_tank, "Live fish in tanks that don't exist"),
+    'fish_sharing_tank': (fish_sharing_tank, "Live fish that share a tank"),
+    'tank_without_system': (tank_without_system, "Tanks with no system that are not hospital tanks"),
+    'tank_in_unknown_system': (tank_in_unknown_system, "Tanks in systems that don't exist"),
+    'broken_move_chain': (broken_move_chain, "Tank moves that don't start where the last one ended"),
+    'tank_differs_from_last_move': (tank_differs_from_last_move,
+                                    "Fish whose tank doesn't match their last move"),
+}
+
+def scan(tables, rules=None):
+    """Run the integrity rules (all of them by default) against tables that
+    have already been loaded, returning one row per violation"""
+
+    found = []
+    for name in rules or integrity_rules:
+        rule, _ = integrity_rules[name]
+        violations = rule(tables)
+        logger.debug(f"{name}: {len(violations)} violations")
+        if not violations.empty:
+            found.append(violations)
+
+    if not found:
+        return pd.DataFrame(columns=violation_columns)
+    return pd.concat(found, ignore_index=True)
@@ -0,0 +1,138 @@
+import streamlit as st
+import pandas as pd
+import logging
+from collections import deque
+
+import utils.dbfunctions as db
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+lineage_events = ['Split Group', 'Merge Groups']
+
+def get_lineage_edges():
+    """Turn the Split Group and Merge Groups rows in the Groups table into an
+    edge list with one row per (parent, child) pair"""
+
+    try:
+        pages = list(db.iter_table_pages('Groups',
+                                         filters=[('in_', 'event_type', lineage_events)]))
+    except Exception as e:
+        st.error(f"Database error in get_lineage_edges: {e}")
+        pages = []
+
+    columns = ['parent', 'child', 'date', 'event_type']
+    if not pages:
+        return pd.DataFrame(columns=columns)
+
+    events = pd.concat(pages, ignore_index=True)
+    group_cols = [c for c in events.columns if c.startswith('group_')]
+
+    long = events.melt(id_vars=['date', 'event_type', 'original_group', 'new_group'],
+                       value_vars=group_cols, value_name='group')
+    long = long.dropna(subset=['group'])
+
+    is_split = long['event_type'] == 'Split Group'
+    # a split lists the original group among the new ones, and a merge
+    # lists the groups that went into the new one
+    edges = pd.DataFrame({
+        'parent': long['original_group'].where(is_split, long['group']),
+        'child': long['group'].where(is_split, long['new_group']),
+        'date': long['date'],
+        'event_type': long['event_type']
+    })
+    edges = edges.dropna(subset=['parent', 'child'])
+    edges = edges[edges['parent'] != edges['child']]
+
+    return edges[columns].sort_values('date').reset_index(drop=True)
+
+@st.cache_resource(max_entries=2)
+def _build_index(latest_event):
+    edges = get_lineage_edges()
+
+    parents = {}
+    children = {}
+    for parent, child, date, event_type in edges.itertuples(index=False):
+        parents.setdefault(child, []).append((parent, date, event_type))
+        children.setdefault(parent, []).append((child, date, event_type))
+
+    logger.debug(f"Built lineage index with {len(edges)} edges")
+    return {'parents': parents, 'children': children}
+
+def get_lineage_index():
+    """Get the lineage graph as parent and child adjacency lists, rebuilt only
+    when there is a new row in the Groups table"""
+    return _build_index(db.get_latest_id('Groups'))
+
+def _walk(links, fish_id):
+    """Breadth-first walk over one direction of the graph, returning each fish
+    reached with its distance and the event that linked it"""
+
+    found = {}
+    queue = deque([(fish_id, 0)])
+    while queue:
+        cur, depth = queue.popleft()
+        for other, date, event_type in links.get(cur, []):
+            if other not in found and other != fish_id:
+                found[other] = {'fish': other, 'generation': depth + 1,
+                                'via': cur, 'date': date, 'event_type': event_type}
+                queue.append((other, depth + 1))
+
+    return pd.DataFrame(found.values(), columns=['fish', 'generation', 'via', 'date', 'event_type'])
+
+def get_ancestors(fish_id):
+    """All the groups that this fish or group was split or merged from"""
+    return _walk(get_lineage_index()['parents'], fish_id)
+
+def get_descendants(fish_id):
+    """All the groups that were split or merged from this fish or group"""
+    return _walk(get_lineage_index()['children'], fish_id)
+
+def get_provenance(fish_id):
+    """Get the ancestors of a fish and the collections they came from"""
+
+    ancestors = get_ancestors(fish_id)
+    fish_ids = [fish_id] + ancestors['fish'].tolist()
+
+    try:
+        supabase = db.get_supabase_client()
+        response = (
+            supabase.table('Fish')
+            .select('id, collection, Collections(name, date, town, water_body, is_commercial)')
+            .in_('id', fish_ids)
+            .execute()
+        )
+        collections = pd.DataFrame(db.flatten_dict_list(response.data))
+    except Exception as e:
+        st.error(f"Database error in get_provenance: {e}")
+        collections = pd.DataFrame()
+
+    return ancestors, collections
+
+def show_lineage(fish_id):
+    """Show where a fish or group came from and what it was split or merged into"""
+
+    with st.expander("🧬 Lineage", expanded=False):
+        ancestors, collections = get_provenance(fish_id)
+        descendants = get_descendants(fish_id)
+
+        if not collections.empty and 'name' in collections.columns:
+            sources = collections.dropna(subset=['name']).drop_duplicates('collection')
+            for source in sources.itertuples():
+                st.markdown(f"**Collected from:** {source.name} ({str(source.date)[:10]})")
+        else:
+            st.markdown("**Collected from:** unknown")
+
+        if ancestors.empty:
+            st.markdown("No earlier groups")
+        else:
+            st.markdown("**Came from:**")
+            for anc in ancestors.sort_values('generation').itertuples():
+                st.markdown(f"{'↳ ' * anc.generation}{anc.fish} "
+                            f"({anc.event_type}, {str(anc.date)[:10]})")
+
+        if not descendants.empty:
+            st.markdown("**Split or merged into:**")
+            for desc in descendants.sort_values('generation').itertuples():
+                st.markdown(f"{'↳ ' * desc.generation}{desc.fish} "
+                            f"({desc.event_type}, {str(desc.date)[:10]})")
@@ -0,0 +1,170 @@
+import streamlit as st
+import pandas as pd
+import logging
+
+import utils.dbfunctions as db
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# stand-ins for "before the records start" and "still there"
+_since_always = pd.Timestamp('1900-01-01')
+_until_now = pd.Timestamp('2200-01-01')
+
+_residency_columns = ['fish', 'tank', 'system', 'location', 'start', 'end', 'is_current']
+
+def _read_pages(table_name, columns, filters):
+    try:
+        pages = list(db.iter_table_pages(table_name, columns=columns, filters=filters))
+    except Exception as e:
+        st.error(f"Database error reading {table_name}: {e}")
+        pages = []
+    pages = [p for p in pages if not p.empty]
+    if not pages:
+        return pd.DataFrame(columns=[c.strip() for c in columns.split(',')])
+    return pd.concat(pages, ignore_index=True)
+
+def build_residency():
+    """Turn the Tank Move events in the Health table into one row for each
+    stretch of time that a fish or group spent in a tank.
+
+    A fish is in the from_tank of its first move from the day it was collected,
+    and then in the to_tank of each move until the next one. Fish that never
+    moved have been in their current tank since they were collected, or, if
+    they have died (which clears their tank), in the tank recorded with their
+    death. The last stretch ends when the fish died, or is still open."""
+
+    fish = db.get_all_fish(include_dead=True, include_system_details=False, as_csv=True)
+    if fish.empty:
+        return pd.DataFrame(columns=_residency_columns)
+
+    collections = db.get_all_from_table('Collections', as_csv=True)
+    tanks = db.get_all_tanks(return_df=True)
+
+    moves = _read_pages('Health', 'id, fish, date, from_tank, to_tank',
+                        [('eq', 'event_type', 'Tank Move')])
+    deaths = pd.concat([
+        _read_pages('Health', 'id, fish, date, from_tank', [('eq', 'event_type', 'Death')]),
+        _read_pages('Health', 'id, fish, date, from_tank', [('eq', 'change_status', 'Dead')])
+    ], ignore_index=True)
+
+    moves['date'] = db.naive_dates(moves['date'])
+    deaths['date'] = db.naive_dates(deaths['date'])
+
+    fish = fish.set_index('id')
+    arrival = pd.Series(pd.NaT, index=fish.index, dtype='datetime64[ns]')
+    if not collections.empty:
+        collected = db.naive_dates(collections['date'])
+        collected.index = collections['id']
+        arrival = fish['collection'].map(collected).astype('datetime64[ns]')
+    arrival = arrival.fillna(_since_always)
+
+    deaths = deaths.sort_values('date')
+    death = deaths.groupby('fish')['date'].min()
+    death = death.where(fish.reindex(death.index)['status'].eq('Dead'))
+    death_tank = deaths.dropna(subset=['from_tank']).groupby('fish')['from_tank'].first()
+
+    moves = moves.sort_values(['fish', 'date', 'id'])
+    first_move = moves.drop_duplicates('fish').set_index('fish')
+
+    # stretch before the first move, or the whole history for fish that never moved
+    before = pd.DataFrame({'fish': fish.index,
+                           'tank': fish['tank'].values,
+                           'start': arrival.values})
+    moved = before['fish'].isin(first_move.index)
+    before.loc[moved, 'tank'] = before.loc[moved, 'fish'].map(first_move['from_tank'])
+    before['tank'] = before['tank'].fillna(before['fish'].map(death_tank))
+
+    after = pd.DataFrame({'fish': moves['fish'].values,
+                          'tank': moves['to_tank'].values,
+                          'start': moves['date'].values})
+
+    residency = pd.concat([before, after], ignore_index=True)
+    residency = residency.sort_values(['fish', 'start'], kind='stable')
+    residency['end'] = residency.groupby('fish')['start'].shift(-1)
+    residency['end'] = residency['end'].fillna(residency['fish'].map(death))
+    residency['is_current'] = residency['end'].isna()
+    residency['end'] = residency['end'].fillna(_until_now)
+
+    residency = residency.dropna(subset=['tank'])
+    residency = residency[residency['end'] > residency['start']]
+
+    systems = tanks.set_index('name')['system'] if not tanks.empty else pd.Series(dtype=object)
+    residency['system'] = residency['tank'].map(systems)
+    # tanks outside a system (hospital tanks) only share water with themselves
+    residency['location'] = residency['system'].fillna(residency['tank'])
+
+    return residency[_residency_columns].reset_index(drop=True)
+
+@st.cache_resource(max_entries=2, ttl=600)
+def _build_index(latest_event):
+    residency = build_residency()
+    logger.debug(f"Built occupancy index with {len(residency)} intervals")
+    return residency
+
+def get_occupancy_index():
+    """Get the residency intervals for every fish, rebuilt when there is a new
+    row in the Health table (or at least every 10 minutes, for new fish)"""
+    return _build_index(db.get_latest_id('Health'))
+
+def get_residency(fish_id):
+    """Where a fish or group has been, oldest first"""
+
+    residency = get_occupancy_index()
+    return residency[residency['fish'] == fish_id].sort_values('start')
+
+def get_occupants(location, start, end=None):
+    """Every fish that was in a system or tank at any time between start and end"""
+
+    residency = get_occupancy_index()
+    start = pd.Timestamp(start)
+    end = _until_now if end is None else pd.Timestamp(end)
+
+    inside = residency[((residency['location'] == location) | (residency['tank'] == location)) &
+                       (residency['start'] < end) & (residency['end'] > start)]
+    return inside.sort_values(['fish', 'start'])
+
+def find_contacts(fish_id, start, end=None, by='location'):
+    """Find every fish that shared a system (or a tank, if by='tank') with
+    fish_id at any time between start and end.
+
+    This is an interval join: the intervals of the sick fish are joined to
+    all the other intervals on the same system, and only the pairs that
+    overlap are kept. Returns one row per contact with when the overlap
+    started and ended and how many days it lasted."""
+
+    columns = ['fish', by, 'contact_start', 'contact_end', 'days', 'is_current']
+
+    residency = get_occupancy_index()
+    start = pd.Timestamp(start)
+    end = _until_now if end is None else pd.Timestamp(end)
+
+    sick = residency[residency['fish'] == fish_id]
+    sick = sick.assign(start=sick['start'].clip(lower=start),
+                       end=sick['end'].clip(upper=end))
+    sick = sick[sick['end'] > sick['start']]
+    if sick.empty:
+        return pd.DataFrame(columns=columns)
+
+    others = residency[residency['fish'] != fish_id]
+    pairs = sick[[by, 'start', 'end', 'is_current']].merge(others, on=by, suffixes=('_sick', ''))
+
+    pairs['contact_start'] = pairs[['start', 'start_sick']].max(axis=1)
+    pairs['contact_end'] = pairs[['end', 'end_sick']].min(axis=1)
+    pairs = pairs[pairs['contact_end'] > pairs['contact_start']]
+    if pairs.empty:
+        return pd.DataFrame(columns=columns)
+
+    pairs['days'] = (pairs['contact_end'] - pairs['contact_start']).dt.total_seconds() / 86400
+    pairs['is_current'] = pairs['is_current'] & pairs['is_current_sick']
+
+    contacts = (pairs.groupby(['fish', by])
+                .agg(contact_start=('contact_start', 'min'),
+                     contact_end=('contact_end', 'max'),
+                     days=('days', 'sum'),
+                     is_current=('is_current', 'any'))
+                .reset_index())
+    contacts['days'] = contacts['days'].round(1)
+    contacts.loc[contacts['contact_end'] >= _until_now, 'contact_end'] = pd.NaT
+
+    return contacts[columns].sort_values(['contact_start', 'fish']).reset_index(drop=True)
@@ -0,0 +1,105 @@
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+import time
+import logging
+
+import utils.dbfunctions as db
+import utils.treatments as treatments
+from utils.cache import table_version, is_empty
+from utils.client import background_session
+from utils.settings import prefetch_max_age
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# The datasets that each page of the daily workflow loads when it opens, as
+# name: (loader, tables whose changes make it stale). The loaders use the
+# same arguments as the pages
+prefetch_loaders = {
+    'live fish summary': (lambda: db.get_fish_summary(include_dead=False, return_df=True),
+                          ['fish_summary']),
+    'feeding summary': (db.get_feeding_summary, ['Feeding']),
+    'tanks': (db.get_all_tanks, ['Tanks', 'Fish']),
+    'fish summary': (lambda: db.get_fish_summary(return_df=True), ['fish_summary']),
+    'treatment intervals': (treatments.get_treatment_intervals, ['Fish']),
+    'all tanks': (lambda: db.get_all_tanks(only_active=False), ['Tanks', 'Fish']),
+    'systems': (db.get_all_systems, ['Systems']),
+    'maintenance logs': (db.get_maintenance_logs, []),
+    'live groups': (lambda: db.get_all_fish(include_dead=False, only_groups=True, return_df=True),
+                    ['Fish']),
+}
+
+# The daily workflow: Check Water → Check Fish → Health Details → Weekly
+# Tasks → Recount Fish, and what the next page needs
+workflow_next = {
+    'Check Water': ['live fish summary', 'feeding summary', 'tanks'],
+    'Check Fish': ['fish summary', 'treatment intervals', 'all tanks'],
+    'Health Details': ['systems', 'maintenance logs'],
+    'Weekly Tasks': ['live groups', 'tanks'],
+}
+
+@st.cache_resource
+def _executor():
+    """Threads for prefetching, shared by every session"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix='prefetch')
+
+def _versions(tables):
+    return tuple(table_version(table) for table in tables)
+
+def _is_fresh(entry, tables):
+    return (time.time() - entry['started'] < prefetch_max_age
+            and entry['versions'] == _versions(tables))
+
+def _load_as(access_token, loader):
+    # runs in a prefetch thread, which has no session of its own
+    with background_session(access_token):
+        return loader()
+
+def prefetch_next(page):
+    """Start loading the datasets for the page after this one in the daily
+    workflow, while the user works on this one. The results are kept in this
+    session until the next page asks for them with get_prefetched.
+
+    Called on every rerun; datasets that are already loading, or were loaded
+    recently and have not been changed since, are not started again. The
+    reads are done as the logged in user; nothing is prefetched without a login"""
+
+    session = st.session_state.get('session')
+    if session is None:
+        return
+    access_token = session.access_token
+
+    prefetched = st.session_state.setdefault('prefetched', {})
+    for name in workflow_next.get(page, []):
+        loader, tables = prefetch_loaders[name]
+        entry = prefetched.get(name)
+        if entry is not None and _is_fresh(entry, tables):
+            continue
+
+        # the versions are taken before the read, as in utils/cache.py, so a
+        # change made while it is loading makes the result stale
+        prefetched[name] = {'started': time.time(),
+                            'versions': _versions(tables),
+                            'future': _executor().submit(_load_as, access_token, loader)}
+        logger.debug(f"Prefetching {name}")
+
+def get_prefetched(name):
+    """The dataset called name, from the prefetch if it is still fresh
+    (waiting for it if it is still loading), or else read now"""
+
+    loader, tables = prefetch_loaders[name]
+    entry = st.session_state.get('prefetched', {}).pop(name, None)
+    if entry is not None and _is_fresh(entry, tables):
+        try:
+            value = entry['future'].result()
+        except Exception as e:
+            logger.warning(f"Prefetch of {name} failed: {e}")
+            value = None
+
+        # the loaders return an empty result after a database error, and the
+        # error is only shown if the read is done in the page
+        if value is not None and not is_empty(value):
+            logger.debug(f"Using prefetched {name}")
+            return value
+
+    return loader()
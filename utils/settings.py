@@ -11,4 +11,70 @@ health_status_colors = {
     "🟡 Monitor": "Monitor",
     "🟠 Sick": "Sick",
     "⚪️ Dead": "Dead"
-}
\ No newline at end of file
+}
+
+# Acceptable range (low, high) for water quality checks, used for alerts.
+# A system can override these with <param>_min and <param>_max columns in the Systems table
+water_limits = {
+    'ammonia': (None, 0.25),
+    'nitrite': (None, 0.25),
+    'ph': (6.5, 8.0),
+    'conductivity': (150, 1000)
+}
+
+# A reading is also flagged if it is this many standard deviations from the
+# average of the previous water_baseline_days days
+water_zscore_limit = 3
+water_baseline_days = 14
+
+# How long (in seconds) reference data (People, Systems, Tanks, Species and
+# Fish) is kept in the cache shared by all sessions, if the database has no
+# table_versions table. Writes through utils/dbfunctions.py clear it sooner
+reference_cache_ttl = 300
+
+# With the table_versions table (migrations/0005_table_versions.sql), cached
+# reference data is checked against the database at most every
+# version_poll_interval seconds, and otherwise kept for up to versioned_cache_ttl
+version_poll_interval = 2
+versioned_cache_ttl = 3600
+
+# Datasets for the next page of the daily workflow are loaded in the
+# background (utils/prefetch.py), and used if they are at most this many
+# seconds old when the user gets there
+prefetch_max_age = 120
+
+# Home page dashboard (migrations/0006_dashboard_summary.sql): how long the
+# summary is cached, how many days without a water check make a system
+# overdue, and how far ahead to warn about expiring permits
+dashboard_cache_ttl = 60
+water_check_days = 1
+permit_warning_days = 30
+
+# Maintenance tasks on the Weekly and Monthly Tasks pages, with how often (in
+# days) each one should be done. Tasks in lab_wide_tasks are done once for the
+# whole lab; the others are done for each system
+weekly_tasks = {
+    'Recount Fish': 7,
+    'Rinse Filter Pad': 7,
+    'Rinse Filter Bag': 7,
+    'Rotate Biofilter': 7,
+    'Scrub Tanks': 7,
+    'Refill pH and Conductivity Reservoirs': 7,
+    'Mix Net Sterilizer': 7,
+    'Clean Floor': 7,
+    'Check Logging Computer': 7
+}
+
+monthly_tasks = {
+    'Change carbon': 30,
+    'Change mechanical filter': 30,
+    'Calibrate pH probe': 30,
+    'Calibrate conductivity probe': 30,
+    'Check alarm thresholds': 30
+}
+
+lab_wide_tasks = ['Recount Fish', 'Mix Net Sterilizer', 'Clean Floor', 'Check Logging Computer']
+
+# Systems that need a task more or less often than usual, as
+# (task, system): days
+task_cadence_overrides = {}
@@ -0,0 +1,99 @@
+import streamlit as st
+import pandas as pd
+
+import utils.dbfunctions as db
+from utils.settings import lab_wide_tasks, task_cadence_overrides
+
+_status_columns = ['task', 'system', 'cadence_days', 'last_done', 'by',
+                   'days_since', 'days_overdue', 'status']
+
+def task_schedule(tasks, system_names):
+    """Every (task, system) pair that should be done, with its cadence in days.
+    tasks is a dict of task: days, like weekly_tasks in utils/settings.py.
+    Lab wide tasks have system None"""
+
+    rows = []
+    for task, days in tasks.items():
+        systems = [None] if task in lab_wide_tasks else system_names
+        for system in systems:
+            rows.append({'task': task,
+                         'system': system,
+                         'cadence_days': task_cadence_overrides.get((task, system), days)})
+    return pd.DataFrame(rows, columns=['task', 'system', 'cadence_days'])
+
+def get_task_status(tasks, system_names):
+    """When each task was last done for each system, and whether it is
+    overdue, from one read of the latest row per (task, system).
+
+    status is 'never done', 'overdue', 'due today' or 'ok'"""
+
+    schedule = task_schedule(tasks, system_names)
+    latest = db.get_latest_maintenance(tasks=list(tasks))
+
+    # lab wide tasks are matched to their latest row for any system, since
+    # they were logged with a system picked before there was a schedule
+    is_lab_wide = latest['task'].isin(lab_wide_tasks)
+    lab_wide = (latest[is_lab_wide].sort_values('date')
+                .groupby('task', as_index=False).last()
+                .assign(system=None))
+    latest = pd.concat([latest[~is_lab_wide], lab_wide], ignore_index=True)
+
+    # merge can't match None to None, so use a placeholder for the lab
+    status = (schedule.fillna({'system': ''})
+              .merge(latest.fillna({'system': ''})[['task', 'system', 'date', 'by']],
+                     on=['task', 'system'], how='left')
+              .rename(columns={'date': 'last_done'}))
+    status['system'] = status['system'].mask(status['system'] == '', None)
+    # with no rows to match, merge can leave last_done as objects
+    status['last_done'] = pd.to_datetime(status['last_done'])
+
+    now = pd.Timestamp.now(tz=status['last_done'].dt.tz)
+    status['days_since'] = (now.normalize() - status['last_done'].dt.normalize()).dt.days
+    status['days_overdue'] = status['days_since'] - status['cadence_days']
+
+    status['status'] = 'ok'
+    status.loc[status['days_overdue'] == 0, 'status'] = 'due today'
+    status.loc[status['days_overdue'] > 0, 'status'] = 'overdue'
+    status.loc[status['last_done'].isna(), 'status'] = 'never done'
+
+    return status[_status_columns]
+
+status_icons = {
+    'never done': '⚪',
+    'overdue': '🔴',
+    'due today': '🟡',
+    'ok': '🟢'
+}
+
+def describe_task(task_status):
+    """One line summary of a task's status over its systems, for the task list"""
+
+    if task_status.empty:
+        return ""
+
+    if len(task_status) == 1:
+        row = task_status.iloc[0]
+        if pd.isna(row['last_done']):
+            return f"{status_icons['never done']} Never done"
+        text = f"{status_icons[row['status']]} Last done {row['last_done'].strftime('%Y-%m-%d')}"
+        if row['days_overdue'] > 0:
+            text += f", {int(row['days_overdue'])} day(s) overdue"
+        return text
+
+    late = task_status[task_status['status'].isin(['overdue', 'never done'])]
+    if late.empty:
+        due = task_status[task_status['status'] == 'due today']
+        if due.empty:
+            return f"{status_icons['ok']} Up to date"
+        return f"{status_icons['due today']} Due today: {', '.join(due['system'])}"
+    return f"{status_icons['overdue']} Overdue: {', '.join(late['system'])}"
+
+def show_task_status(status):
+    """Table of every task and system, most overdue first"""
+
+    n_late = status['status'].isin(['overdue', 'never done']).sum()
+    with st.expander(f"Task schedule ({n_late} overdue)", expanded=False):
+        table = status.sort_values(['days_overdue', 'task'], ascending=[False, True], na_position='first')
+        table = table.assign(status=table['status'].map(lambda s: f"{status_icons[s]} {s}"),
+                             last_done=table['last_done'].dt.strftime('%Y-%m-%d %H:%M'))
+        st.dataframe(table.fillna({'system': '(lab)'}), hide_index=True, width='stretch')
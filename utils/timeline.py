@@ -0,0 +1,166 @@
+import streamlit as st
+import pandas as pd
+import heapq
+import logging
+from itertools import islice
+
+import utils.dbfunctions as db
+from utils.water import water_params
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# columns to read from each event table, and an icon for the timeline
+timeline_tables = {
+    'Feeding': ('id, date, by, fish, fed, ate, notes', '🍽️'),
+    'Health': ('id, date, by, fish, event_type, change_status, from_tank, to_tank, treatment, notes', '💊'),
+    'WaterQuality': ('id, date, by, system, tank, conductivity, ph, ammonia, nitrite, nitrate, '
+                     'water_change_pct, notes', '💧'),
+    'Maintenance': ('id, date, by, task, system, notes', '🧽'),
+    'Groups': ('id, date, by, event_type, original_group, new_group, number_in_group, notes', '🐟'),
+    'Experiments': ('id, date, by, fish, project, is_terminal, n_fish, notes', '🔬')
+}
+
+# tables whose rows are about one fish or group
+_fish_tables = ['Feeding', 'Health', 'Experiments']
+# tables whose rows are about a system
+_system_tables = ['WaterQuality', 'Maintenance']
+
+def _is_true(value):
+    # missing booleans come back as NA (or NaN), which isn't True or False
+    return pd.notna(value) and bool(value)
+
+def _describe(table_name, row):
+    """Subject (fish, group or system) and a short description of one event"""
+
+    if table_name == 'Feeding':
+        if not _is_true(row.get('fed')):
+            what = "Not fed"
+        else:
+            what = "Fed, ate" if _is_true(row.get('ate')) else "Fed, did not eat"
+        return row['fish'], what
+
+    if table_name == 'Health':
+        what = row['event_type']
+        if pd.notna(row.get('from_tank')) or pd.notna(row.get('to_tank')):
+            what += f" from {row.get('from_tank')} to {row.get('to_tank')}"
+        if pd.notna(row.get('treatment')):
+            what += f" ({row['treatment']})"
+        if pd.notna(row.get('change_status')):
+            what += f" → {row['change_status']}"
+        return row['fish'], what
+
+    if table_name == 'WaterQuality':
+        values = [f"{label} {row[param]:g}" for param, label in water_params.items()
+                  if pd.notna(row.get(param))]
+        subject = row['system'] if pd.notna(row.get('system')) else row.get('tank')
+        return subject, ', '.join(values) or "Water check"
+
+    if table_name == 'Maintenance':
+        subject = row['system'] if pd.notna(row.get('system')) else 'All systems'
+        return subject, row['task']
+
+    if table_name == 'Groups':
+        subject = row['original_group'] if pd.notna(row.get('original_group')) else row.get('new_group')
+        what = row['event_type']
+        if pd.notna(row.get('number_in_group')):
+            what += f": {int(row['number_in_group'])} fish"
+        return subject, what
+
+    if table_name == 'Experiments':
+        what = f"{row['project']}"
+        if _is_true(row.get('is_terminal')):
+            what += f" (terminal, {int(row['n_fish']) if pd.notna(row.get('n_fish')) else 1} fish)"
+        return row['fish'], what
+
+    return None, ''
+
+def _quoted(ids):
+    return ','.join('"' + str(i).replace('"', '\\"') + '"' for i in ids)
+
+def _table_filters(table_name, start, end, system_fish=None, system=None, person=None):
+    """Build the server side filters for one table, or None if no row of this
+    table can match"""
+
+    filters = [('gte', 'date', start.isoformat()), ('lt', 'date', end.isoformat())]
+
+    if person is not None:
+        filters.append(('eq', 'by', person))
+
+    if system is not None:
+        if table_name in _system_tables:
+            filters.append(('eq', 'system', system))
+        elif not system_fish:
+            return None
+        elif table_name in _fish_tables:
+            filters.append(('in_', 'fish', system_fish))
+        elif table_name == 'Groups':
+            # split events list the group in original_group, merges in new_group
+            ids = _quoted(system_fish)
+            filters.append(('or_', f'original_group.in.({ids}),new_group.in.({ids})', None))
+
+    return filters
+
+def _stream(table_name, filters, page_size):
+    """Yield the events in one table, newest first, reading a page at a time
+    only as the merge needs them"""
+
+    columns, icon = timeline_tables[table_name]
+    # id breaks ties between rows with the same date, so the pages don't overlap
+    for page in db.iter_table_pages(table_name, columns=columns, filters=filters,
+                                    order_by=['date', 'id'], desc=True, page_size=page_size):
+        if page.empty:
+            return
+        page = page.assign(date=db.naive_dates(page['date']))
+
+        for row in page.to_dict('records'):
+            subject, what = _describe(table_name, row)
+            yield {'date': row['date'], 'table': table_name, 'icon': icon,
+                   'subject': subject, 'event': what, 'by': row.get('by'),
+                   'notes': row.get('notes')}
+
+def iter_timeline(start, end, system=None, person=None, tables=None, page_size=100):
+    """Interleave the events from all the event tables between start and end,
+    newest first.
+
+    Each table is read as its own date-ordered stream, and the streams are
+    combined with a k-way merge, so only as many rows are fetched from each
+    table as are needed for the events that are actually used."""
+
+    tables = tables or list(timeline_tables.keys())
+
+    system_fish = None
+    if system is not None:
+        fish = db.get_all_fish(include_system_details=True, return_df=True)
+        if not fish.empty and 'system' in fish.columns:
+            system_fish = fish.loc[fish['system'] == system, 'id'].tolist()
+
+    streams = []
+    for table_name in tables:
+        filters = _table_filters(table_name, start, end, system_fish=system_fish,
+                                 system=system, person=person)
+        if filters is not None:
+            streams.append(_stream(table_name, filters, page_size))
+
+    return heapq.merge(*streams, key=lambda e: e['date'], reverse=True)
+
+def get_timeline(start, end, system=None, person=None, tables=None,
+                 page=0, per_page=50):
+    """Get one page of the timeline. Returns the events as a DataFrame and
+    whether there are more after this page"""
+
+    # no table can contribute more than the events up to the end of this page
+    fetch = min((page + 1) * per_page + 1, 1000)
+
+    try:
+        merged = iter_timeline(start, end, system=system, person=person,
+                               tables=tables, page_size=fetch)
+        events = list(islice(merged, page * per_page, (page + 1) * per_page + 1))
+    except Exception as e:
+        st.error(f"Database error in get_timeline: {e}")
+        events = []
+
+    has_more = len(events) > per_page
+    events = pd.DataFrame(events[:per_page],
+                          columns=['date', 'table', 'icon', 'subject', 'event', 'by', 'notes'])
+    return events, has_more
@@ -0,0 +1,128 @@
+import streamlit as st
+import pandas as pd
+import threading
+import logging
+
+import utils.dbfunctions as db
+from utils.dbfunctions import treatment_start_events, treatment_end_events
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_interval_columns = ['fish', 'start', 'end', 'treatment', 'end_notes', 'is_open', 'days']
+
+def _empty_intervals():
+    """No intervals, with the same column types as pair_treatments returns, so
+    that filtering on is_open and sorting by days still work"""
+    return pd.DataFrame({'fish': pd.Series(dtype='str'),
+                         'start': pd.Series(dtype='datetime64[ns]'),
+                         'end': pd.Series(dtype='datetime64[ns]'),
+                         'treatment': pd.Series(dtype='str'),
+                         'end_notes': pd.Series(dtype='str'),
+                         'is_open': pd.Series(dtype='bool'),
+                         'days': pd.Series(dtype='float64')})
+
+def pair_treatments(events):
+    """Pair treatment start and end events into intervals for every fish at once.
+
+    Each start is matched to the next end for the same fish. Starts that are
+    repeated before an end (e.g. a change of dose) are treated as one course
+    that began at the first start. Starts with no end yet are open."""
+
+    if events.empty:
+        return _empty_intervals()
+
+    is_start = events['event_type'].isin(treatment_start_events)
+    is_end = events['event_type'].isin(treatment_end_events)
+
+    starts = events.loc[is_start, ['fish', 'date', 'treatment']].sort_values('date')
+    ends = (events.loc[is_end, ['fish', 'date', 'treatment']]
+            .rename(columns={'date': 'end', 'treatment': 'end_notes'})
+            .sort_values('end'))
+
+    if starts.empty:
+        return _empty_intervals()
+
+    paired = pd.merge_asof(starts, ends, left_on='date', right_on='end', by='fish',
+                           direction='forward')
+
+    intervals = (paired.groupby(['fish', 'end'], dropna=False)
+                 .agg(start=('date', 'min'),
+                      treatment=('treatment', 'first'),
+                      end_notes=('end_notes', 'first'))
+                 .reset_index())
+
+    intervals['is_open'] = intervals['end'].isna()
+    now = pd.Timestamp.now(tz=intervals['start'].dt.tz)
+    intervals['days'] = (intervals['end'].fillna(now) - intervals['start']).dt.days
+
+    return intervals[_interval_columns].sort_values(['fish', 'start']).reset_index(drop=True)
+
+@st.cache_resource
+def _treatment_state():
+    """Treatment events and intervals shared by every session, with the id of
+    the last Health row that has been read"""
+    return {'lock': threading.Lock(),
+            'last_id': 0,
+            'events': pd.DataFrame(),
+            'intervals': _empty_intervals()}
+
+def get_treatment_intervals():
+    """Get every treatment interval, open or closed. Only Health rows added
+    since the last call are read, and only the fish in them are re-paired"""
+
+    state = _treatment_state()
+    with state['lock']:
+        try:
+            new_events = list(db.iter_table_pages(
+                'Health', columns='id, fish, date, event_type, treatment',
+                filters=[('gt', 'id', state['last_id']),
+                         ('in_', 'event_type', treatment_start_events + treatment_end_events)],
+                order_by='id'))
+        except Exception as e:
+            st.error(f"Database error in get_treatment_intervals: {e}")
+            new_events = []
+
+        if new_events:
+            new_events = pd.concat(new_events, ignore_index=True)
+            changed = new_events['fish'].unique()
+            state['last_id'] = int(new_events['id'].max())
+
+            if not state['events'].empty:
+                new_events = pd.concat([state['events'], new_events], ignore_index=True)
+            state['events'] = new_events
+
+            kept = state['intervals'][~state['intervals']['fish'].isin(changed)]
+            repaired = pair_treatments(state['events'][state['events']['fish'].isin(changed)])
+            if not kept.empty:
+                repaired = pd.concat([kept, repaired], ignore_index=True)
+            state['intervals'] = repaired
+            logger.debug(f"Re-paired treatments for {len(changed)} fish")
+
+        intervals = state['intervals'].copy()
+
+    # durations of open treatments keep growing
+    if not intervals.empty:
+        now = pd.Timestamp.now(tz=intervals['start'].dt.tz)
+        intervals['days'] = (intervals['end'].fillna(now) - intervals['start']).dt.days
+
+    return intervals
+
+def get_active_treatments():
+    """Get the treatments that have started but not ended, longest first"""
+
+    intervals = get_treatment_intervals()
+    return intervals[intervals['is_open'].astype(bool)].sort_values('days', ascending=False)
+
+def show_active_treatments():
+    """Show a board of the fish that are currently being treated"""
+
+    active = get_active_treatments()
+    with st.expander(f"💊 Active treatments ({len(active)})", expanded=False):
+        if active.empty:
+            st.info("No fish are being treated")
+        else:
+            board = active[['fish', 'treatment', 'start', 'days']].copy()
+            board['start'] = board['start'].dt.strftime('%Y-%m-%d')
+            st.dataframe(board, width='stretch', hide_index=True,
+                         column_config={'days': st.column_config.NumberColumn('Days')})
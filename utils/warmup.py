@@ -0,0 +1,98 @@
+import streamlit as st
+import threading
+import time
+import logging
+
+import utils.dbfunctions as db
+import utils.occupancy as occupancy
+from utils.client import init_background_supabase, background_session
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# what to load, in order. The reads use the same arguments as the pages, so
+# that the pages find them in the shared cache. They are done as the first
+# user to log in, or with the background client if the [supabase] secrets
+# have a background_key (see init_background_supabase). The anon key on its
+# own can't read the lab's tables, and empty results aren't cached, so
+# without a background_key the warm-up waits for a login
+warmup_steps = [
+    ('Supabase client', init_background_supabase),
+    ('People', db.get_all_people),
+    ('Systems', db.get_all_systems),
+    ('Tanks', db.get_all_tanks),
+    ('Tanks (table)', lambda: db.get_all_tanks(return_df=True)),
+    ('Species', db.get_all_species),
+    ('Live fish summary', lambda: db.get_fish_summary(include_dead=False, return_df=True)),
+    ('Fish summary', lambda: db.get_fish_summary(return_df=True)),
+    ('Feeding summary', db.get_feeding_summary),
+    ('Occupancy index', occupancy.get_occupancy_index),
+]
+
+@st.cache_resource
+def _warmup_state():
+    """Progress of the warm-up, one per server process"""
+    return {'lock': threading.Lock(),
+            'thread': None,
+            'started': None,
+            'finished': None,
+            'steps': []}
+
+def _run(state, access_token):
+    if access_token is not None:
+        with background_session(access_token):
+            _run_steps(state)
+    else:
+        _run_steps(state)
+
+def _run_steps(state):
+    for name, step in warmup_steps:
+        t0 = time.perf_counter()
+        try:
+            step()
+            error = None
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {e}")
+            error = str(e)
+        state['steps'].append({'step': name,
+                               'seconds': round(time.perf_counter() - t0, 2),
+                               'error': error})
+    state['finished'] = time.time()
+    logger.info(f"Warm-up finished in {state['finished'] - state['started']:.1f} s")
+
+def _has_background_key():
+    try:
+        return 'background_key' in st.secrets['supabase']
+    except Exception:
+        return False
+
+def start_warmup(access_token=None):
+    """Start loading the shared caches in a background thread. Called on every
+    run of app.py, which is the first page anyone opens (Streamlit has no hook
+    for when the server starts); only the first call that can read anything
+    starts it, and later calls do nothing.
+
+    access_token is the login of the current session, if there is one. With
+    no background_key in the secrets, the warm-up doesn't start until there
+    is a login to read with"""
+
+    if access_token is None and not _has_background_key():
+        return
+
+    state = _warmup_state()
+    with state['lock']:
+        if state['thread'] is not None:
+            return
+        state['started'] = time.time()
+        state['thread'] = threading.Thread(target=_run, args=(state, access_token),
+                                           name='cache-warmup', daemon=True)
+        state['thread'].start()
+
+def get_warmup_status():
+    """When the warm-up started and finished, and how long each step took"""
+
+    state = _warmup_state()
+    return {'started': state['started'],
+            'finished': state['finished'],
+            'steps': list(state['steps']),
+            'total': len(warmup_steps)}
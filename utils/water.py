@@ -0,0 +1,258 @@
+import streamlit as st
+import pandas as pd
+import threading
+import logging
+
+import utils.dbfunctions as db
+from utils.settings import water_limits, water_zscore_limit, water_baseline_days
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Water quality columns and how to label them
+water_params = {
+    'conductivity': 'Conductivity',
+    'ph': 'pH',
+    'ammonia': 'Ammonia',
+    'nitrite': 'Nitrite',
+    'nitrate': 'Nitrate',
+    'water_change_pct': 'Water change (%)'
+}
+
+rollup_stats = ['min', 'max', 'mean', 'last']
+
+_keys = ['system', 'tank', 'param']
+
+def _partial_rollups(readings, freq='D'):
+    """Aggregate raw WaterQuality rows into per-period partial aggregates
+    (count, sum, min, max, last) for each system, tank and parameter.
+
+    Partial aggregates can be combined with each other, which is what lets
+    the rollups be updated with only the new rows."""
+
+    cols = [c for c in water_params if c in readings.columns]
+    long = readings.melt(id_vars=['system', 'tank', 'date'], value_vars=cols,
+                         var_name='param', value_name='value')
+    long = long.dropna(subset=['value'])
+    long['value'] = long['value'].astype(float)
+    long['period'] = long['date'].dt.to_period(freq).dt.start_time
+
+    long = long.sort_values('date')
+    grouped = long.groupby(_keys + ['period'], dropna=False)
+    partial = grouped['value'].agg(['count', 'sum', 'min', 'max', 'last'])
+    partial['last_date'] = grouped['date'].max()
+
+    return partial.reset_index()
+
+def _combine(partials, period):
+    """Combine partial aggregates, grouping them by a new period column"""
+
+    partials = partials.assign(period=period).sort_values('last_date')
+    grouped = partials.groupby(_keys + ['period'], dropna=False)
+    combined = grouped.agg(count=('count', 'sum'),
+                           sum=('sum', 'sum'),
+                           min=('min', 'min'),
+                           max=('max', 'max'),
+                           last=('last', 'last'),
+                           last_date=('last_date', 'max'))
+
+    return combined.reset_index()
+
+@st.cache_resource
+def _rollup_state():
+    """Daily rollups shared by every session, with the id of the last
+    WaterQuality row that has been added to them"""
+    return {'lock': threading.Lock(),
+            'last_id': 0,
+            'daily': pd.DataFrame()}
+
+def update_rollups():
+    """Add any WaterQuality rows logged since the last update to the daily
+    rollups. Usually this is one small request that returns nothing."""
+
+    state = _rollup_state()
+    with state['lock']:
+        try:
+            # read a page at a time so the first load doesn't hold the whole table
+            for new_rows in db.iter_table_pages('WaterQuality',
+                                                filters=[('gt', 'id', state['last_id'])],
+                                                order_by='id'):
+                if new_rows['date'].dt.tz is not None:
+                    new_rows['date'] = new_rows['date'].dt.tz_localize(None)
+
+                new_partial = _partial_rollups(new_rows, freq='D')
+                if state['daily'].empty:
+                    state['daily'] = new_partial
+                else:
+                    daily = pd.concat([state['daily'], new_partial], ignore_index=True)
+                    state['daily'] = _combine(daily, daily['period'])
+
+                state['last_id'] = int(new_rows['id'].max())
+                logger.debug(f"Added {len(new_rows)} readings to water rollups")
+        except Exception as e:
+            st.error(f"Database error updating water rollups: {e}")
+
+    return state['daily']
+
+def _finish(partials):
+    partials = partials.copy()
+    partials['mean'] = partials['sum'] / partials['count']
+    partials['location'] = partials['system'].fillna(partials['tank'])
+    return partials
+
+def get_rollups(freq='D'):
+    """Get the water quality rollups with min, max, mean and last for each
+    system/tank, parameter and day ('D') or week ('W')"""
+
+    daily = update_rollups()
+    if daily.empty:
+        return daily
+
+    if freq == 'D':
+        return _finish(daily)
+
+    period = daily['period'].dt.to_period(freq).dt.start_time
+    return _finish(_combine(daily, period))
+
+def chart_data(param, stat='mean', start=None, end=None, locations=None,
+               max_points=300):
+    """Get one statistic of one parameter as a table with a column for each
+    system or tank, ready to plot.
+
+    Long date ranges are downsampled to weekly rollups, and then to blocks of
+    several weeks, so that there are at most about max_points rows."""
+
+    daily = update_rollups()
+    if daily.empty:
+        return pd.DataFrame()
+
+    data = daily[daily['param'] == param]
+    if start is not None:
+        data = data[data['period'] >= pd.Timestamp(start)]
+    if end is not None:
+        data = data[data['period'] <= pd.Timestamp(end)]
+
+    data = _finish(data)
+    if locations:
+        data = data[data['location'].isin(locations)]
+    if data.empty:
+        return pd.DataFrame()
+
+    span_days = (data['period'].max() - data['period'].min()).days + 1
+    if span_days > max_points:
+        period = data['period'].dt.to_period('W').dt.start_time
+        n_weeks = span_days // 7 + 1
+        if n_weeks > max_points:
+            # combine several weeks into each point
+            block = pd.Timedelta(weeks=-(-n_weeks // max_points))
+            first = period.min()
+            period = first + ((period - first) // block) * block
+        data = _finish(_combine(data, period))
+
+    return data.pivot_table(index='period', columns='location', values=stat,
+                            aggfunc='mean')
+
+def get_water_limits():
+    """Get the acceptable range for each alert parameter in each system, as a
+    table with columns system, param, low and high. Uses the defaults from
+    settings unless the Systems table has <param>_min or <param>_max columns"""
+
+    systems = db.get_all_systems(return_df=True)
+    names = systems['name'].tolist() if not systems.empty else []
+
+    limits = pd.DataFrame([{'system': name, 'param': param, 'low': low, 'high': high}
+                           for name in names + [None]
+                           for param, (low, high) in water_limits.items()])
+    limits[['low', 'high']] = limits[['low', 'high']].astype(float)
+
+    for param in water_limits:
+        for col, bound in [(f'{param}_min', 'low'), (f'{param}_max', 'high')]:
+            if col in systems.columns:
+                override = limits['param'].eq(param) & limits['system'].notna()
+                by_system = limits.loc[override, 'system'].map(systems.set_index('name')[col])
+                limits.loc[override, bound] = by_system.fillna(limits.loc[override, bound])
+
+    return limits
+
+def evaluate_alerts(days_back=7):
+    """Check every recent daily rollup against the limits for its system, and
+    against its own recent history (rolling z-score), all in one pass.
+
+    Returns one row per reading that is out of range, with the kind of alert
+    ('high', 'low' or 'unusual') and a message."""
+
+    daily = get_rollups('D')
+    if daily.empty:
+        return pd.DataFrame()
+
+    daily = daily[daily['param'].isin(water_limits.keys())]
+    daily = daily.sort_values(_keys + ['period'])
+
+    # baseline from the water_baseline_days calendar days before each reading
+    # (not counting that day), for each system/tank and parameter. The window
+    # is by date, so days with no readings don't stretch it
+    rolling = (daily.set_index('period')
+               .groupby(_keys, dropna=False)['last']
+               .rolling(f'{water_baseline_days}D', closed='left', min_periods=5))
+    baseline = pd.DataFrame({'baseline': rolling.mean(), 'spread': rolling.std()}).reset_index()
+    daily = daily.merge(baseline, on=_keys + ['period'], how='left')
+    daily = daily.assign(zscore=(daily['last'] - daily['baseline'])
+                         / daily['spread'].where(daily['spread'] > 0))
+
+    cutoff = pd.Timestamp.now().normalize() - pd.Timedelta(days=days_back)
+    recent = daily[daily['period'] >= cutoff]
+
+    # tanks outside a system use the default limits
+    recent = recent.merge(get_water_limits(), on=['system', 'param'], how='left')
+
+    is_high = recent['last'] > recent['high']
+    is_low = recent['last'] < recent['low']
+    is_unusual = recent['zscore'].abs() > water_zscore_limit
+
+    recent = recent.assign(kind=None)
+    recent.loc[is_unusual, 'kind'] = 'unusual'
+    recent.loc[is_low, 'kind'] = 'low'
+    recent.loc[is_high, 'kind'] = 'high'
+    alerts = recent[recent['kind'].notna()].copy()
+    if alerts.empty:
+        return alerts
+
+    labels = alerts['param'].map(water_params)
+    values = alerts['last'].round(2).astype(str)
+    alerts['message'] = labels + ' ' + values
+    alerts.loc[alerts['kind'] == 'high', 'message'] += ' is above ' + alerts['high'].astype(str)
+    alerts.loc[alerts['kind'] == 'low', 'message'] += ' is below ' + alerts['low'].astype(str)
+    alerts.loc[alerts['kind'] == 'unusual', 'message'] += \
+        ' is unusual (z = ' + alerts['zscore'].round(1).astype(str) + ')'
+
+    return alerts[['location', 'system', 'tank', 'param', 'period', 'last_date',
+                   'last', 'kind', 'zscore', 'message']]
+
+def get_open_alerts(days_back=7):
+    """Get the alerts that are still open: the most recent reading of that
+    parameter in that system or tank is still out of range"""
+
+    alerts = evaluate_alerts(days_back=days_back)
+    if alerts.empty:
+        return alerts
+
+    daily = get_rollups('D')
+    latest = daily.groupby(_keys, dropna=False)['period'].max().rename('latest').reset_index()
+    alerts = alerts.merge(latest, on=_keys, how='left')
+
+    return alerts[alerts['period'] == alerts['latest']].drop(columns='latest')
+
+def show_water_alerts(locations=None):
+    """Show the open water quality alerts, optionally only for some systems or tanks"""
+
+    alerts = get_open_alerts()
+    if not alerts.empty and locations is not None:
+        alerts = alerts[alerts['location'].isin(locations)]
+    if alerts.empty:
+        return alerts
+
+    st.warning(f"⚠️ {len(alerts)} open water quality alert(s)")
+    for alert in alerts.sort_values('location').itertuples():
+        st.markdown(f"**{alert.location}** ({alert.period.strftime('%Y-%m-%d')}): {alert.message}")
+
+    return alerts